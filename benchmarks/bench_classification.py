@@ -0,0 +1,83 @@
+"""
+Benchmark of the change classification stage of generate_results_df.
+
+Compares the former row-wise apply implementation with the vectorized
+`classify_changes` on a synthetic merged frame and checks both give the same labels.
+
+Usage:
+    python benchmarks/bench_classification.py --rows 100000
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from spring_change_detection.diff import classify_changes  # noqa: E402
+
+REF_OLD, REF_NEW = "Référence_old", "Référence_new"
+MASS_OLD, MASS_NEW = "Masse_old", "Masse_new"
+
+
+def make_merged(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Build a merged frame shaped like the one produced by the outer merge."""
+    rng = np.random.default_rng(seed)
+    refs = np.array([f"9812{i:04d}" for i in range(50)], dtype=object)
+    return pd.DataFrame({
+        REF_OLD: rng.choice(refs, rows),
+        REF_NEW: rng.choice(refs, rows),
+        MASS_OLD: rng.choice([1200.0, 1250.5, 1300.0], rows),
+        MASS_NEW: rng.choice([1200.0, 1250.5, 1300.0], rows),
+        "_merge": rng.choice(["both", "right_only", "left_only"], rows, p=[0.9, 0.05, 0.05]),
+    })
+
+
+def classify_rowwise(merged: pd.DataFrame) -> None:
+    """Reference implementation: the row-wise apply version."""
+    merged["Mass Difference"] = merged[MASS_NEW] - merged[MASS_OLD]
+    merged["Mass Status"] = merged["Mass Difference"].apply(
+        lambda d: "Increased" if d > 0 else ("Decreased" if d < 0 else "Unchanged")
+    )
+    merged["Reference Status"] = merged.apply(
+        lambda r: "Change" if r[REF_OLD] != r[REF_NEW] else "No Change", axis=1
+    )
+
+    def classify(row: pd.Series) -> str:
+        if row["_merge"] == "right_only":
+            return "New"
+        return "Spring Changed" if row[REF_OLD] != row[REF_NEW] else "Unchanged"
+
+    merged["Change Type"] = merged.apply(classify, axis=1)
+
+
+def timed(func, frame: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    func(frame)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    merged = make_merged(args.rows)
+    rowwise, vectorized = merged.copy(), merged.copy()
+
+    t_rowwise = timed(classify_rowwise, rowwise)
+    t_vectorized = timed(
+        lambda df: classify_changes(df, REF_OLD, REF_NEW, MASS_OLD, MASS_NEW), vectorized
+    )
+    pd.testing.assert_frame_equal(rowwise, vectorized)
+
+    print(f"rows:        {args.rows}")
+    print(f"row-wise:    {t_rowwise:.3f} s")
+    print(f"vectorized:  {t_vectorized:.3f} s")
+    print(f"speedup:     {t_rowwise / t_vectorized:.0f}x (identical labels)")
+
+
+if __name__ == "__main__":
+    main()
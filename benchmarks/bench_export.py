@@ -0,0 +1,78 @@
+"""
+Benchmark of the Excel export (highlighting of the PTA sheet).
+
+Times the former per-row DataFrame lookup against build_excel_report
+at increasing row counts. A linear export keeps a flat time per row.
+
+Usage:
+    python benchmarks/bench_export.py --rows 1000 2000 4000 --columns 120
+"""
+import io
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from synthetic import make_pta_workbook  # noqa: E402
+from spring_change_detection.parsing import FileHandler  # noqa: E402
+from spring_change_detection.diff import generate_results_df  # noqa: E402
+from spring_change_detection.export import build_excel_report  # noqa: E402
+
+
+def export_rowwise(data: bytes, results_df: pd.DataFrame) -> bytes:
+    """Reference implementation: filter the results frame once per worksheet row."""
+    wb = load_workbook(io.BytesIO(data))
+    ws = wb["PTA"]
+    row_idx = 3
+    while ws.cell(row=row_idx, column=1).value is not None:
+        match = results_df[results_df['Cell ID New'] == row_idx]
+        if not match.empty:
+            change_type = match['Change Type'].values[0]
+            if change_type in ('New', 'Spring Changed'):
+                color = 'FF5733' if change_type == 'New' else 'B4C6E7'
+                fill = PatternFill('solid', fgColor=color)
+                for col in range(1, ws.max_column + 1):
+                    ws.cell(row=row_idx, column=col).fill = fill
+        row_idx += 1
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 2000, 4000])
+    parser.add_argument("--columns", type=int, default=120)
+    parser.add_argument("--skip-rowwise", action="store_true",
+                        help="only time the current implementation")
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'row-wise (s)':>13} {'us/row':>8} {'lookup (s)':>11} {'us/row':>8}")
+    for rows in args.rows:
+        old = make_pta_workbook(rows, args.columns, seed=1)
+        new = make_pta_workbook(rows, args.columns, seed=2, revision_of=1)
+        old_df = FileHandler.validate_excel_file(old, "old")[2]
+        new_df = FileHandler.validate_excel_file(new, "new")[2]
+        results_df = generate_results_df(old_df, new_df, "VP")
+
+        t_rowwise = float("nan")
+        if not args.skip_rowwise:
+            start = time.perf_counter()
+            export_rowwise(new, results_df)
+            t_rowwise = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_excel_report(new, results_df)
+        t_lookup = time.perf_counter() - start
+
+        print(f"{rows:>8} {t_rowwise:>13.2f} {t_rowwise / rows * 1e6:>8.0f} "
+              f"{t_lookup:>11.2f} {t_lookup / rows * 1e6:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
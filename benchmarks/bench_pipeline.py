@@ -0,0 +1,169 @@
+"""
+Benchmark of every stage of the comparison pipeline on synthetic workbooks.
+
+For each PTA type and size, an old and a new revision (with auxiliary
+sheets and embedded images) are generated, then each stage is timed
+separately with empty caches and the persistent store disabled:
+
+    validate_excel_file   typed read and validation of the new file
+    clean_dataframe       normalization of the compared columns
+    generate_results_df   comparison of old and new
+    build_excel_report    highlighted Excel report
+    read_sheets           sheet index, auxiliary sheets and their images
+
+The median of each stage is compared with the stored baseline, and the
+command exits with 1 when a stage is slower than the baseline by more than
+the threshold (and by more than a noise floor in seconds).
+
+Usage:
+    python benchmarks/bench_pipeline.py --rows 1000 10000 --types VP VU
+    python benchmarks/bench_pipeline.py --rows 100000 500000 --repeat 1
+    python benchmarks/bench_pipeline.py --save-baseline    # after an intended change
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from synthetic import cached_workbook  # noqa: E402
+from spring_change_detection import parsing, diff  # noqa: E402
+from spring_change_detection.config import STORE_CONFIG, UPLOAD_CONFIG  # noqa: E402
+from spring_change_detection.parsing import FileHandler  # noqa: E402
+from spring_change_detection.diff import clean_dataframe, generate_results_df  # noqa: E402
+from spring_change_detection.export import build_excel_report  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+STAGES = (
+    "validate_excel_file", "clean_dataframe", "generate_results_df",
+    "build_excel_report", "read_sheets",
+)
+
+
+def clear_caches() -> None:
+    """Empty the in-process caches so every run does the full work."""
+    parsing._PARSE_CACHE.clear()
+    diff._RESULTS_CACHE.clear()
+
+
+def time_stage(run: Callable[[], object], repeat: int) -> float:
+    """Median wall time of `run` over `repeat` runs, each with empty caches."""
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def read_sheets(data: bytes) -> None:
+    """What the results page reads: the sheet index, every auxiliary sheet and its images."""
+    index = FileHandler.read_workbook(data)
+    for name in index["sheet_names"]:
+        if name != UPLOAD_CONFIG["sheet_name"]:
+            FileHandler.read_sheet(data, name)
+    for name in index["drawing_sheets"]:
+        FileHandler.read_sheet_images(data, name)
+
+
+def bench(pta_type: str, rows: int, args: argparse.Namespace) -> Dict[str, float]:
+    """Time every stage for one PTA type and size."""
+    params = dict(extra_columns=args.columns, pta_type=pta_type,
+                  aux_sheets=args.aux_sheets, images=args.images)
+    old = cached_workbook(rows, seed=1, **params)
+    new = cached_workbook(rows, seed=2, revision_of=1, **params)
+
+    old_df = FileHandler.validate_excel_file(old, "old", pta_type)[2]
+    new_df = FileHandler.validate_excel_file(new, "new", pta_type)[2]
+    results_df = generate_results_df(old_df, new_df, pta_type)
+
+    runs = {
+        "validate_excel_file": lambda: FileHandler.validate_excel_file(new, "new", pta_type),
+        "clean_dataframe": lambda: clean_dataframe(new_df),
+        "generate_results_df": lambda: generate_results_df(old_df, new_df, pta_type),
+        "build_excel_report": lambda: build_excel_report(new, results_df),
+        "read_sheets": lambda: read_sheets(new),
+    }
+    return {stage: time_stage(runs[stage], args.repeat) for stage in args.stages}
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    """Stored stage times keyed by "<type>/<rows>/<stage>" (empty when there is no file)."""
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+
+def save_baseline(path: Path, results: Dict[str, float]) -> None:
+    """Store `results` over the existing baseline entries, with the machine they ran on."""
+    merged = {**load_baseline(path), **results}
+    path.write_text(json.dumps({
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+        },
+        "results": dict(sorted(merged.items())),
+    }, indent=2) + "\n", encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--types", nargs="+", choices=("VP", "VU"), default=["VP", "VU"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--columns", type=int, default=40, help="filler option columns")
+    parser.add_argument("--aux-sheets", type=int, default=2)
+    parser.add_argument("--images", type=int, default=2, help="images per auxiliary sheet")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown over the baseline (default: 0.25, i.e. 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.02,
+                        help="slowdowns smaller than this are timing noise (default: 0.02)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these times as the new baseline")
+    parser.add_argument("--json", type=Path, help="also write the times to this file")
+    args = parser.parse_args(argv)
+
+    # the persistent store would turn every validation after the first into a file read
+    STORE_CONFIG["enabled"] = False
+    baseline = load_baseline(args.baseline)
+
+    results, regressions = {}, []
+    print(f"{'type':<4} {'rows':>8} {'stage':<20} {'median (s)':>10} {'baseline':>9} {'change':>8}")
+    for pta_type in args.types:
+        for rows in args.rows:
+            for stage, seconds in bench(pta_type, rows, args).items():
+                key = f"{pta_type}/{rows}/{stage}"
+                results[key] = seconds
+                reference = baseline.get(key)
+                change, flag = "", ""
+                if reference:
+                    ratio = seconds / reference - 1
+                    change = f"{ratio:+.0%}"
+                    if ratio > args.threshold and seconds - reference > args.min_seconds:
+                        flag = "  REGRESSION"
+                        regressions.append(key)
+                print(f"{pta_type:<4} {rows:>8} {stage:<20} {seconds:>10.3f} "
+                      f"{reference if reference else float('nan'):>9.3f} {change:>8}{flag}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} stage(s) slower than the baseline by more than "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Benchmark of the import (cold start) time of the app and of the core package.
+
+Each target is imported in a fresh interpreter several times; the median
+wall time is reported with the heavy libraries the import pulled in.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+TARGETS = {
+    "app": "app",
+    "core: parsing": "spring_change_detection.parsing",
+    "core: diff": "spring_change_detection.diff",
+    "core: export": "spring_change_detection.export",
+    "core: cli": "spring_change_detection.cli",
+}
+HEAVY_MODULES = ("streamlit", "plotly.express", "openpyxl", "PIL", "pyarrow")
+
+_PROBE = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def time_import(module: str) -> tuple:
+    """Import `module` in a fresh interpreter; return (seconds, heavy modules loaded)."""
+    code = _PROBE.format(src=str(SRC), module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    elapsed, loaded = json.loads(out.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'target':<16} {'median (s)':>10} {'min (s)':>8}  heavy imports")
+    for name, module in TARGETS.items():
+        runs = [time_import(module) for _ in range(args.repeat)]
+        times = [t for t, _ in runs]
+        print(f"{name:<16} {statistics.median(times):>10.3f} {min(times):>8.3f}  "
+              f"{', '.join(runs[-1][1]) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Equivalence check of the join engines of the comparison.
+
+`generate_results_df` must give the same result with the "merge" and "hash"
+engines, incremental or not. Both are run on:
+
+    synthetic    old/new revisions from `synthetic.py`, read with the typed schema
+    reordered    typed frames whose key columns hold the same categories in
+                 different orders (e.g. ["B", "a"] cleaned to ["b", "a"]
+                 against ["a", "b"]), which must still be encoded against one
+                 shared dictionary
+    chain        `generate_chain` against the pairwise comparisons
+
+The command exits with 1 when any result differs from the merge engine.
+
+Usage:
+    python benchmarks/check_engines.py
+    python benchmarks/check_engines.py --cases 2000 --rows 5000
+"""
+import sys
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from synthetic import cached_workbook  # noqa: E402
+from spring_change_detection import diff  # noqa: E402
+from spring_change_detection.config import (  # noqa: E402
+    REQUIRED_COLUMNS, STORE_CONFIG, VP_COLUMNS_KEY, VU_COLUMNS_KEY
+)
+from spring_change_detection.parsing import FileHandler  # noqa: E402
+from spring_change_detection.diff import generate_chain, generate_results_df  # noqa: E402
+
+SETTINGS = [("merge", True), ("hash", False), ("hash", True)]
+
+
+def same_rows(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    """Equal rows, categoricals compared by value (a chain shares a wider dictionary)."""
+    def values(df):
+        df = df.reset_index(drop=True)
+        return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    return values(a).equals(values(b))
+
+
+def compare_engines(old_df: pd.DataFrame, new_df: pd.DataFrame, pta_type: str) -> List[str]:
+    """Settings (engine/incremental) whose result differs from the full merge."""
+    results = {}
+    for engine, incremental in [("merge", False)] + SETTINGS:
+        diff._RESULTS_CACHE.clear()
+        results[(engine, incremental)] = generate_results_df(
+            old_df.copy(), new_df.copy(), pta_type, engine=engine, incremental=incremental
+        )
+    reference = results[("merge", False)]
+    return [f"{engine}/incremental={incremental}" for engine, incremental in SETTINGS
+            if not same_rows(results[(engine, incremental)], reference)]
+
+
+def reordered_frame(rng: np.random.Generator, rows: int, pta_type: str) -> pd.DataFrame:
+    """Typed PTA frame with case and spacing variants of the keys, so cleaning reorders categories."""
+    keys = VP_COLUMNS_KEY if pta_type == "VP" else VU_COLUMNS_KEY
+    variants = ["a", "A", "b", "B", " c", "c"]
+    df = pd.DataFrame({
+        **{key: rng.choice(variants, rows) for key in keys[:3]},
+        **{key: rng.choice(["X", None], rows) for key in keys[3:]},
+        REQUIRED_COLUMNS["reference"]: rng.integers(0, 3, rows).astype(str).astype(object),
+        REQUIRED_COLUMNS["mass"]: rng.choice([1000.0, 1050.0], rows),
+    })
+    for key in keys:
+        # a random category order, like the typed read of a real file
+        categories = df[key].dropna().unique()
+        df[key] = pd.Categorical(df[key], categories=rng.permutation(categories))
+    return df
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=300, help="random reordered-category cases")
+    parser.add_argument("--rows", type=int, default=1000, help="rows of the synthetic workbooks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    STORE_CONFIG["enabled"] = False
+
+    failures = []
+    for pta_type in ("VP", "VU"):
+        params = dict(extra_columns=5, pta_type=pta_type)
+        old = FileHandler.validate_excel_file(cached_workbook(args.rows, seed=1, **params), "old", pta_type)[2]
+        new = FileHandler.validate_excel_file(
+            cached_workbook(args.rows, seed=2, revision_of=1, **params), "new", pta_type
+        )[2]
+        failures += [f"synthetic {pta_type}: {name}" for name in compare_engines(old, new, pta_type)]
+
+    rng = np.random.default_rng(args.seed)
+    for case in range(args.cases):
+        pta_type = ("VP", "VU")[case % 2]
+        frames = [reordered_frame(rng, int(rng.integers(1, 12)), pta_type) for _ in range(3)]
+        failures += [f"reordered case {case}: {name}"
+                     for name in compare_engines(frames[0], frames[1], pta_type)]
+
+        pairwise = [
+            generate_results_df(a.copy(), b.copy(), pta_type, engine="merge", incremental=False)
+            for a, b in zip(frames, frames[1:])
+        ]
+        for engine in ("merge", "hash"):
+            diff._RESULTS_CACHE.clear()
+            chained, _ = generate_chain([f.copy() for f in frames], pta_type, ["r0", "r1", "r2"], engine)
+            if not all(same_rows(c, p) for c, p in zip(chained, pairwise)):
+                failures.append(f"chain case {case}: {engine}")
+
+    for failure in failures:
+        print(f"DIFFERS  {failure}")
+    print(f"{len(failures)} difference(s) over 2 synthetic pairs and {args.cases} reordered cases")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
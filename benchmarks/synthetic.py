@@ -0,0 +1,178 @@
+"""
+Synthetic PTA workbooks for the benchmarks.
+
+A generated workbook has a `PTA` sheet laid out like the real files (header
+row, one skipped row, then one car per row) with the key columns of the PTA
+type, the reference and mass columns from `config` plus filler option
+columns. Like in the real files:
+  - the engine, gearbox and trim keys take a few values and the other keys
+    are `X` checkbox columns, so many cars share a composite key;
+  - references are numbers, read as floats when the sheet is not typed;
+  - auxiliary sheets hold small tables and embedded images (charts).
+
+Generated workbooks can be kept on disk with `cached_workbook`, since the
+largest ones take minutes to write.
+"""
+import io
+import sys
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from spring_change_detection.config import (  # noqa: E402
+    REQUIRED_COLUMNS, UPLOAD_CONFIG, VP_COLUMNS_KEY, VU_COLUMNS_KEY
+)
+
+CACHE_DIR = Path(__file__).resolve().parent / ".data"
+
+
+def make_pta_workbook(
+    rows: int,
+    extra_columns: int = 20,
+    seed: int = 0,
+    revision_of: Optional[int] = None,
+    pta_type: str = "VP",
+    aux_sheets: int = 0,
+    images: int = 0,
+) -> bytes:
+    """
+    Build a synthetic PTA workbook.
+
+    Args:
+        rows: Number of cars (data rows) in the PTA sheet.
+        extra_columns: Number of filler option columns.
+        seed: Random seed of the base revision.
+        revision_of: When set, derive a new revision of the workbook generated
+            with this seed: some references and masses change and a few cars
+            are added and removed.
+        pta_type: "VP" or "VU", selecting the key columns of the PTA sheet.
+        aux_sheets: Number of auxiliary sheets after the PTA sheet.
+        images: Number of images embedded in each auxiliary sheet.
+
+    Returns:
+        The workbook as .xlsx bytes.
+    """
+    key_columns = VP_COLUMNS_KEY if pta_type == "VP" else VU_COLUMNS_KEY
+    rng = np.random.default_rng(seed if revision_of is None else revision_of)
+    keys = [
+        rng.choice(["dv5", "eb2", "hdi", "ep6"], rows),
+        rng.choice(["bvm6", "eat8"], rows),
+        rng.choice(["active", "allure", "gt"], rows),
+    ] + [rng.choice(["X", None], rows) for _ in key_columns[3:]]
+    references = rng.integers(98_000_000, 98_000_050, rows).astype(float)
+    masses = rng.choice([1200.0, 1250.5, 1300.0, 1350.25], rows)
+    options = [rng.choice(["a", "b", "X", None], rows) for _ in range(extra_columns)]
+
+    keep = np.ones(rows, dtype=bool)
+    if revision_of is not None:
+        changes = np.random.default_rng(seed)
+        references[changes.random(rows) < 0.05] += 100
+        masses[changes.random(rows) < 0.05] += 25
+        keep = changes.random(rows) >= 0.01
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(UPLOAD_CONFIG["sheet_name"])
+    header = (
+        key_columns
+        + [REQUIRED_COLUMNS["reference"], REQUIRED_COLUMNS["mass"]]
+        + [f"Option {i}" for i in range(extra_columns)]
+    )
+    ws.append(header)
+    ws.append(["-"] * len(header))
+    for i in np.flatnonzero(keep):
+        ws.append(
+            [k[i] for k in keys]
+            + [references[i], masses[i]]
+            + [o[i] for o in options]
+        )
+    if revision_of is not None:
+        for _ in range(max(rows // 100, 1)):
+            ws.append(["new", "eat8", "gt"] + [None] * (len(key_columns) - 3) + [97_000_000.0, 1400.0])
+
+    last_row = 2 + int(keep.sum()) + (max(rows // 100, 1) if revision_of is not None else 0)
+    dimensions = [f"A1:{get_column_letter(len(header))}{last_row}"]
+    for i in range(aux_sheets):
+        dimensions.append(_add_aux_sheet(wb, f"Aux {i + 1}", images, seed + i))
+
+    output = io.BytesIO()
+    wb.save(output)
+    return _add_dimensions(output.getvalue(), dimensions)
+
+
+def _add_aux_sheet(wb: Workbook, title: str, images: int, seed: int) -> str:
+    """Append an auxiliary sheet with a small table and `images` PNG charts; return its used range."""
+    rng = np.random.default_rng(seed)
+    ws = wb.create_sheet(title)
+    ws.append(["Niveau", "Masse mini", "Masse maxi", "Référence ressort"])
+    for level in ("active", "allure", "gt"):
+        for _ in range(20):
+            low = float(rng.integers(1100, 1300))
+            ws.append([level, low, low + 150.0, float(rng.integers(98_000_000, 98_000_050))])
+    for i in range(images):
+        ws.add_image(_chart_image(seed * 100 + i), f"F{2 + 22 * i}")
+    return "A1:D61"
+
+
+def _add_dimensions(data: bytes, dimensions: List[str]) -> bytes:
+    """
+    Write the used range of each sheet, in sheet order, like Excel does.
+
+    openpyxl's write-only mode leaves it out, and readers then scan the
+    whole sheet to size it, which real files never cost.
+    """
+    source = zipfile.ZipFile(io.BytesIO(data))
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            content = source.read(item.filename)
+            if item.filename.startswith("xl/worksheets/sheet"):
+                index = int(item.filename[len("xl/worksheets/sheet"):-len(".xml")]) - 1
+                content = content.replace(
+                    b"</sheetPr>", f'</sheetPr><dimension ref="{dimensions[index]}" />'.encode(), 1
+                )
+            target.writestr(item, content)
+    return output.getvalue()
+
+
+def _chart_image(seed: int):
+    """A 1200x800 PNG standing for a chart pasted in the workbook."""
+    from PIL import Image as PILImage
+    from openpyxl.drawing.image import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = np.full((800, 1200, 3), 255, dtype=np.uint8)
+    heights = rng.integers(100, 700, 12)
+    for i, height in enumerate(heights):
+        pixels[800 - height:, 60 + i * 95:130 + i * 95] = (68, 114, 196)
+    buffer = io.BytesIO()
+    PILImage.fromarray(pixels).save(buffer, format="PNG")
+    buffer.seek(0)
+    return Image(buffer)
+
+
+def cached_workbook(rows: int, **params) -> bytes:
+    """
+    `make_pta_workbook(rows, **params)`, kept under benchmarks/.data once generated.
+
+    Args:
+        rows: Number of cars (data rows) in the PTA sheet.
+        **params: Other arguments of `make_pta_workbook`.
+
+    Returns:
+        The workbook as .xlsx bytes.
+    """
+    name = "-".join([f"rows={rows}"] + [f"{k}={v}" for k, v in sorted(params.items())])
+    path = CACHE_DIR / f"{name}.xlsx"
+    if path.is_file():
+        return path.read_bytes()
+    data = make_pta_workbook(rows, **params)
+    CACHE_DIR.mkdir(exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    return data
@@ -1,16 +1,26 @@
 import streamlit as st
 
 from config import PAGE_TITLE, PAGE_ICON, PAGE_LAYOUT, INITIAL_SIDEBAR_STATE
-from ui.sidebar import render_sidebare
+from ui.sidebar import render_sidebare, render_diagnostics, render_memory_report
 from ui.uploads import render_upload_section
 from ui.analysis import render_analysis
 from ui.results import Result
+from ui.batch import render_batch_section
 from utils.session_state import SessionStateManager
 from ui.styles import STYLES
-import streamlit.components.v1 as com
-from data_processing import generate_results_df
+from spring_change_detection.config import INSTRUMENTATION_CONFIG, STORE_CONFIG
+from spring_change_detection.diff import generate_results_df
+from spring_change_detection.instrumentation import log_stages, recording
+from report_worker import submit_report
+
+# the server processes share the PTA sheets they parse through the store
+STORE_CONFIG["enabled"] = True
+# one JSON line per stage on stderr (and in SPRING_STAGE_LOG), aggregated across sessions
+log_stages(stderr=True, path=INSTRUMENTATION_CONFIG["log_path"])
 
 def render_hero_section():
+    import streamlit.components.v1 as com
+
     # project title
     col1,col2 = st.columns([10,4], gap="small")
     with col1:
@@ -90,6 +100,11 @@ def render_main_content():
                         st.session_state.analysis_completed = True
                         st.success("✅ Analysis completed successfully!")
                         
+                        # Start building the Excel report while the user reads the analysis
+                        new_file = st.session_state.get('new_file_object')
+                        if new_file is not None and st.session_state.get('results') is not None:
+                            submit_report(new_file.getvalue(), st.session_state['results'])
+                        
                         # Auto-advance option
                         if st.button("📊 View Results", type="primary"):
                             st.session_state.current_step = 'results'
@@ -99,6 +114,11 @@ def render_main_content():
                         st.error(f"❌ Error during analysis: {str(e)}")
                         st.session_state.analysis_completed = False
         
+    elif current_step == 'batch':
+        st.markdown("### 🗂️ Batch Comparison")
+        st.markdown("Compare the old and new PTA files of many vehicle programs in one run.")
+        render_batch_section()
+        
     elif current_step == 'results':
         st.markdown("### 📊 Step 3: Analysis Results")
         st.markdown("Here are your comprehensive analysis results:")
@@ -129,19 +149,8 @@ def render_main_content():
                 st.session_state.current_step = 'analysis'
                 st.rerun()
     
-def main():
-    # Set page configuration FIRST
-    st.set_page_config(
-        page_title=PAGE_TITLE,
-        page_icon=PAGE_ICON,
-        layout=PAGE_LAYOUT,
-        initial_sidebar_state=INITIAL_SIDEBAR_STATE
-    )
-    
-    # Initialize session states
-    session = SessionStateManager
-    session.initialize()
-
+def render_page():
+    """Render the sidebar workflow and the content of the current step"""
     # Initialize current step if not exists
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 'upload'
@@ -161,13 +170,36 @@ def main():
     if (old_df is not None and 
         new_df is not None):
         try:
-            generate_results_df(old_df,new_df,pta_type)
+            st.session_state['results'] = generate_results_df(old_df,new_df,pta_type)
         except Exception as e:
             st.error(f"Error creating result dataframe: {str(e)}")
     
     # Render main content
     render_main_content()
     
+def main():
+    # Set page configuration FIRST
+    st.set_page_config(
+        page_title=PAGE_TITLE,
+        page_icon=PAGE_ICON,
+        layout=PAGE_LAYOUT,
+        initial_sidebar_state=INITIAL_SIDEBAR_STATE
+    )
+    
+    # Initialize session states
+    session = SessionStateManager
+    session.initialize()
+    session.restore_spilled()
+
+    # Record the pipeline stages run for this session
+    with recording(st.session_state["diagnostics"], session=session.session_id()):
+        render_page()
+
+    # Drop or spill what this session holds over the memory budgets
+    session.enforce_memory_budget()
+    render_diagnostics()
+    render_memory_report()
+
     # Footer
     st.markdown("""
     <div style="text-align: center; padding: 20px; color: #666; border-top: 1px solid #eee; margin-top: 40px;">
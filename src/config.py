@@ -1,5 +1,7 @@
 """
 script that hold the configuration of our application
+
+the settings of the comparison engine live in `spring_change_detection.config`
 """
 from pathlib import Path
 
@@ -9,30 +11,15 @@ PAGE_ICON: str = "🚗"
 PAGE_LAYOUT: str = "wide"
 INITIAL_SIDEBAR_STATE: str = "auto"
 
-# ─── Upload restrictions ──────────────────────────────────────────────────────
-UPLOAD_CONFIG = {
-    "allowed_extension": ['xlsx', 'xls'],
-    "max_file_size" : 200,
-    "sheet_name": "PTA",
-    "skip_rows": [1]
-    }
-
-# ─── Columns Data ────────────────────────────────────────────────────
-REQUIRED_COLUMNS: dict = {
-    "mass": "Masse suspendue en charge de référence",
-    "reference": "Référence"
-}
-
-VP_COLUMNS_KEY: list = [
-        "Moteur", "Boite", "Niveau",
-        "Plaque de protection tôle sous GMP",
-        "Pavillon multifonction", "2e PLC Gauche",
-        "Chauffage additionnel type WEBASTO"   
-        ]
-
-VU_COLUMNS_KEY: list =[
-    "Moteur", "Boite", "Niveau", "Plaque de conception"
-]
-
 # ─── Root Path ────────────────────────────────────────────────────
-ROOT_PATH = Path(__file__).resolve().parent.parent
\ No newline at end of file
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+# ─── Session memory ───────────────────────────────────────────────────────────
+SESSION_MEMORY_CONFIG = {
+    # memory budget (bytes) of the objects held by one session only
+    "session_max_bytes": 512 * 1024 * 1024,
+    # memory budget (bytes) of the objects held by all sessions of the server process
+    "process_max_bytes": 2 * 1024 * 1024 * 1024,
+    # frames smaller than this (bytes) are never spilled to the store
+    "spill_min_bytes": 16 * 1024 * 1024,
+    }
@@ -0,0 +1,120 @@
+"""
+Background generation of the Excel report.
+
+The report is built once per (new file, comparison result, export settings)
+in a worker thread shared by every session of the server process, and the
+bytes are cached so the download button can serve them on every rerun.
+"""
+#__TODO: import libraries_______________________________________________
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Hashable, Optional
+
+import pandas as pd
+
+from spring_change_detection.config import CACHE_CONFIG, EXPORT_CONFIG
+from spring_change_detection.export import build_excel_report
+from spring_change_detection.cache import LRUCache, content_hash, frame_fingerprint
+
+# finished reports shared by every session of the server process
+_REPORT_CACHE = LRUCache(CACHE_CONFIG["report_cache_max_bytes"])
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=EXPORT_CONFIG["workers"], thread_name_prefix="excel-report"
+)
+_JOBS: Dict[Hashable, "ReportJob"] = {}
+_JOBS_LOCK = threading.Lock()
+
+
+class ReportJob:
+    """A report being built in the background."""
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.progress = 0.0
+        self.future: Optional[Future] = None
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> bytes:
+        """Wait for the report and return its bytes (re-raises a failed build)."""
+        return self.future.result(timeout)
+
+    def _set_progress(self, fraction: float) -> None:
+        self.progress = max(self.progress, min(fraction, 1.0))
+
+
+#__TODO: cache key of a report_______________________________________________
+def report_key(data: bytes, results_df: pd.DataFrame) -> Hashable:
+    """
+    Build the cache key of the report of `results_df` applied to `data`.
+
+    Only the columns used by the export take part in the result fingerprint.
+
+    Args:
+        data: Raw bytes of the new PTA Excel file.
+        results_df: Comparison result.
+
+    Returns:
+        Hashable key of the report.
+    """
+    return (
+        content_hash(data),
+        frame_fingerprint(results_df[['Cell ID New', 'Change Type']]),
+        EXPORT_CONFIG["engine"],
+        EXPORT_CONFIG["highlight_mode"],
+    )
+
+
+#__TODO: lookup and submission_______________________________________________
+def get_report(key: Hashable) -> Optional[bytes]:
+    """Return the cached report bytes for `key`, or None when not built yet."""
+    return _REPORT_CACHE.get(key)
+
+
+def submit_report(data: bytes, results_df: pd.DataFrame) -> ReportJob:
+    """
+    Start building the report in the background, unless it is cached or
+    already being built (then the running job is returned).
+
+    Args:
+        data: Raw bytes of the new PTA Excel file.
+        results_df: Comparison result.
+
+    Returns:
+        The job building the report. A cached report gives a finished job.
+    """
+    key = report_key(data, results_df)
+    with _JOBS_LOCK:
+        job = _JOBS.get(key)
+        if job is not None:
+            return job
+        job = ReportJob(key)
+        cached = _REPORT_CACHE.get(key)
+        if cached is not None:
+            job.future = Future()
+            job.future.set_result(cached)
+            job.progress = 1.0
+            return job
+        _JOBS[key] = job
+        # run in a copy of the caller's context, so the export stage is
+        # recorded in the diagnostics of the session that started it
+        context = contextvars.copy_context()
+        job.future = _EXECUTOR.submit(
+            context.run, _build, job, data, results_df[['Cell ID New', 'Change Type']]
+        )
+    return job
+
+
+def _build(job: ReportJob, data: bytes, results_df: pd.DataFrame) -> bytes:
+    """Worker body: build the report, cache it and forget the job."""
+    try:
+        report = build_excel_report(data, results_df, on_progress=job._set_progress)
+        _REPORT_CACHE.put(job.key, report)
+        job.progress = 1.0
+        return report
+    finally:
+        # a failed build is retried by the next submission
+        with _JOBS_LOCK:
+            _JOBS.pop(job.key, None)
@@ -0,0 +1,15 @@
+"""
+Core of the spring change detection: PTA parsing, comparison and Excel export.
+
+This package has no UI dependency; the Streamlit app (`src/app.py`) and the
+`spring-diff` command are both built on it.
+
+Modules:
+    config: settings of the engine (sheet layout, key columns, caches, export).
+    parsing: validation and cached parsing of the PTA Excel files.
+    diff: comparison of the old and new PTA sheets.
+    export: highlighted copy of the new workbook.
+    cli: the headless `spring-diff` command.
+    batch: parallel comparison of many file pairs (`spring-diff-batch`).
+    chain: change timeline across N revisions (`spring-diff-chain`).
+"""
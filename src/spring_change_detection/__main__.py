@@ -0,0 +1,5 @@
+import sys
+
+from spring_change_detection.cli import main
+
+sys.exit(main())
@@ -0,0 +1,344 @@
+"""
+Batch comparison of many old/new PTA pairs (one pair per vehicle program).
+
+Pairs come from a manifest (CSV or JSON with `name`, `old`, `new` and an
+optional `type` column) or from a folder holding one sub-folder per pair.
+Every pair is validated, compared and optionally exported in a pool of worker
+processes, and the headline figures of all pairs are gathered in one summary:
+
+    spring-diff-batch programs/ --type VP --workers 8 -o reports/ --summary summary.csv
+
+Exit codes: 0 when no spring changed, 1 when spring changes were found,
+2 when a pair failed.
+"""
+#__TODO: import libraries_______________________________________________
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from spring_change_detection.config import (
+    BATCH_CONFIG, INSTRUMENTATION_CONFIG, STORE_CONFIG, UPLOAD_CONFIG
+)
+from spring_change_detection.parsing import FileHandler
+from spring_change_detection.diff import generate_results_df, summarize_results
+from spring_change_detection.export import OUTPUT_FORMATS, write_report
+from spring_change_detection.instrumentation import log_stages, stage_log_settings
+
+EXIT_NO_CHANGES = 0
+EXIT_SPRING_CHANGES = 1
+EXIT_FAILED_PAIR = 2
+
+
+#__TODO: Collect the pairs_______________________________________________
+def load_manifest(path: Path, default_type: str = "VP") -> List[Dict[str, str]]:
+    """
+    Read the pairs listed in a manifest file.
+
+    Relative paths are resolved against the folder of the manifest.
+
+    Args:
+        path: CSV file or JSON list of objects with `name`, `old`, `new`
+            and optionally `type` ("VP" or "VU").
+        default_type: PTA type of the pairs without a type.
+
+    Returns:
+        List of pairs {"name", "old", "new", "type"}.
+
+    Raises:
+        ValueError: A row misses its old or new file, or has a type other than VP or VU.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        rows = pd.read_csv(path, dtype=str).fillna("").to_dict("records")
+
+    pairs = []
+    for i, row in enumerate(rows):
+        missing = [col for col in ("old", "new") if not row.get(col)]
+        if missing:
+            raise ValueError(f"Manifest row {i + 1}: missing {', '.join(missing)}.")
+        pta_type = (str(row.get("type") or "").strip() or default_type).upper()
+        if pta_type not in ("VP", "VU"):
+            raise ValueError(f"Manifest row {i + 1}: unknown type {row['type']!r} (expected VP or VU).")
+        old, new = (path.parent / row["old"], path.parent / row["new"])
+        pairs.append({
+            "name": row.get("name") or Path(row["new"]).stem,
+            "old": str(old),
+            "new": str(new),
+            "type": pta_type,
+        })
+    return pairs
+
+
+def discover_pairs(folder: Path, default_type: str = "VP") -> List[Dict[str, str]]:
+    """
+    Find the pairs of a folder: each sub-folder holding one Excel file whose
+    name starts with "old" and one starting with "new" is a pair named after it.
+
+    Args:
+        folder: Folder with one sub-folder per pair.
+        default_type: PTA type of every pair.
+
+    Returns:
+        List of pairs {"name", "old", "new", "type"}, sorted by name.
+    """
+    extensions = {f".{ext}" for ext in UPLOAD_CONFIG["allowed_extension"]}
+    pairs = []
+    for sub in sorted(p for p in Path(folder).iterdir() if p.is_dir()):
+        files = [p for p in sub.iterdir() if p.suffix.lower() in extensions]
+        old = [p for p in files if p.name.lower().startswith(BATCH_CONFIG["old_prefix"])]
+        new = [p for p in files if p.name.lower().startswith(BATCH_CONFIG["new_prefix"])]
+        if len(old) == 1 and len(new) == 1:
+            pairs.append({
+                "name": sub.name, "old": str(old[0]), "new": str(new[0]), "type": default_type
+            })
+    return pairs
+
+
+def collect_pairs(
+    source: Path, default_type: str = "VP", root: Optional[Path] = None
+) -> List[Dict[str, str]]:
+    """
+    Pairs of a manifest file or of a folder of pair sub-folders.
+
+    Args:
+        source: Manifest file or folder of pair sub-folders.
+        default_type: PTA type of the pairs without a type.
+        root: When set, `source` (relative to `root` when relative) and every
+            file of the pairs must be inside this folder.
+
+    Returns:
+        List of pairs {"name", "old", "new", "type"}.
+
+    Raises:
+        ValueError: A path is outside of `root`.
+    """
+    source = Path(source) if root is None else resolve_under(root, source)
+    if source.is_dir():
+        pairs = discover_pairs(source, default_type)
+    else:
+        pairs = load_manifest(source, default_type)
+    if root is not None:
+        for pair in pairs:
+            pair["old"] = str(resolve_under(root, pair["old"]))
+            pair["new"] = str(resolve_under(root, pair["new"]))
+    return pairs
+
+
+def resolve_under(root: Path, path: Path) -> Path:
+    """
+    Resolve `path` (relative to `root` when relative), symbolic links included.
+
+    Raises:
+        ValueError: The resolved path is outside of `root`.
+    """
+    root = Path(root).resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root):
+        raise ValueError(f"{path} is outside of the batch folder {root}.")
+    return resolved
+
+
+def max_workers() -> int:
+    """Upper bound of the worker processes of a batch (BATCH_CONFIG, else one per CPU)."""
+    return BATCH_CONFIG["max_workers"] or os.cpu_count() or 1
+
+
+def report_names(pairs: List[Dict[str, str]]) -> List[str]:
+    """
+    File name (without extension) of the report of each pair.
+
+    Pair names are reduced to letters, digits, spaces, dots, dashes and
+    underscores, so a report can never be written outside its folder, and
+    repeated names get a numbered suffix instead of overwriting each other.
+    """
+    names, seen = [], set()
+    for pair in pairs:
+        base = re.sub(r"[^\w.\- ]+", "_", str(pair["name"])).strip(" .") or "pair"
+        name, n = base, 1
+        while name.lower() in seen:  # case-insensitive file systems
+            n += 1
+            name = f"{base}-{n}"
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+#__TODO: Run the batch_______________________________________________
+def run_batch(
+    pairs: List[Dict[str, str]],
+    workers: Optional[int] = None,
+    output_dir: Optional[Path] = None,
+    fmt: str = "xlsx",
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> pd.DataFrame:
+    """
+    Compare every pair in a pool of worker processes.
+
+    A failing pair is reported in the summary and does not stop the batch.
+
+    Args:
+        pairs: Pairs from `collect_pairs`, `load_manifest` or `discover_pairs`.
+        workers: Number of worker processes (default: BATCH_CONFIG["workers"],
+            else one per CPU).
+        output_dir: When set, the report of each pair is written there as
+            `<name>.<fmt>` (see `report_names`).
+        fmt: Report format, one of OUTPUT_FORMATS.
+        on_result: Optional callback receiving each pair summary as it completes.
+
+    Returns:
+        One row per pair (in the order of `pairs`) with its status, error,
+        `summarize_results` figures, report path and duration.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown report format: {fmt!r}")
+    if output_dir is not None:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    workers = min(workers or BATCH_CONFIG["workers"] or os.cpu_count() or 1, max_workers())
+
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+    if pairs:
+        # spawn: forking a server process with running threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(pairs)), mp_context=context,
+            initializer=_init_worker, initargs=(dict(STORE_CONFIG), stage_log_settings()),
+        ) as pool:
+            futures = {
+                pool.submit(_run_pair, pair, output_dir and str(output_dir), fmt, name): i
+                for i, (pair, name) in enumerate(zip(pairs, report_names(pairs)))
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    row = future.result()
+                except Exception as e:  # worker crashed
+                    row = _pair_row(pairs[i], status="error", error=str(e))
+                rows[i] = row
+                if on_result:
+                    on_result(row)
+    return pd.DataFrame(rows, columns=_SUMMARY_COLUMNS)
+
+
+_SUMMARY_COLUMNS = [
+    "name", "type", "status", "error",
+    "total_cars", "new", "spring_changed", "unchanged",
+    "fleet_mass_change", "fleet_mass_total",
+    "report", "seconds", "old_file", "new_file",
+]
+
+
+def _pair_row(pair: Dict[str, str], **values: Any) -> Dict[str, Any]:
+    """Summary row of a pair with the given values (the others left empty)."""
+    row = dict.fromkeys(_SUMMARY_COLUMNS)
+    row.update(name=pair["name"], type=pair["type"], old_file=pair["old"], new_file=pair["new"])
+    row.update(values)
+    return row
+
+
+def _init_worker(store_config: Dict[str, Any], stage_log: Dict[str, Any]) -> None:
+    """Worker start-up: use the persistent store and log the stages like the parent process."""
+    STORE_CONFIG.update(store_config)
+    log_stages(**stage_log)
+
+
+def _run_pair(
+    pair: Dict[str, str], output_dir: Optional[str], fmt: str, report_name: str
+) -> Dict[str, Any]:
+    """Worker body: validate, compare and export one pair."""
+    start = time.perf_counter()
+    try:
+        frames, new_data = {}, None
+        for label in ("old", "new"):
+            data = Path(pair[label]).read_bytes()
+            is_valid, msg, df = FileHandler.validate_excel_file(data, label, pair["type"])
+            if not is_valid:
+                return _pair_row(pair, status="invalid", error=msg,
+                                 seconds=time.perf_counter() - start)
+            frames[label] = df
+            new_data = data
+
+        results_df = generate_results_df(frames["old"], frames["new"], pair["type"])
+        report = None
+        if output_dir is not None:
+            report = str(Path(output_dir) / f"{report_name}.{fmt}")
+            write_report(results_df, new_data, Path(report), fmt)
+        return _pair_row(pair, status="ok", report=report,
+                         seconds=time.perf_counter() - start,
+                         **summarize_results(results_df))
+    except Exception as e:
+        return _pair_row(pair, status="error", error=str(e),
+                         seconds=time.perf_counter() - start)
+
+
+#__TODO: Command line_______________________________________________
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser of `spring-diff-batch`."""
+    parser = argparse.ArgumentParser(
+        prog="spring-diff-batch",
+        description="Detect spring changes for many old/new PTA pairs in parallel.",
+    )
+    parser.add_argument("source", type=Path,
+                        help="manifest (CSV/JSON: name, old, new, type) or folder of pair sub-folders")
+    parser.add_argument("--type", dest="pta_type", choices=("VP", "VU"), default="VP",
+                        help="PTA type of the pairs without a type (default: VP)")
+    parser.add_argument("-w", "--workers", type=int,
+                        help="worker processes (default: from config, else one per CPU)")
+    parser.add_argument("-o", "--output-dir", type=Path,
+                        help="folder receiving one report per pair (default: no report)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="xlsx",
+                        help="report format (default: xlsx)")
+    parser.add_argument("--summary", type=Path,
+                        help="CSV file receiving the consolidated summary")
+    parser.add_argument("--log-stages", action="store_true",
+                        help="print one JSON line per pipeline stage (SPRING_STAGE_LOG: to a file)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of `spring-diff-batch`.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:]).
+
+    Returns:
+        The process exit code.
+    """
+    args = build_parser().parse_args(argv)
+    log_stages(stderr=args.log_stages, path=INSTRUMENTATION_CONFIG["log_path"])
+    try:
+        pairs = collect_pairs(args.source, args.pta_type)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED_PAIR
+
+    start = time.perf_counter()
+    summary = run_batch(pairs, args.workers, args.output_dir, args.format)
+    elapsed = time.perf_counter() - start
+
+    if args.summary:
+        summary.to_csv(args.summary, index=False)
+    columns = ["name", "type", "status", "total_cars", "new", "spring_changed", "unchanged", "seconds"]
+    print(summary[columns].to_string(index=False), file=sys.stderr)
+    for row in summary[summary["status"] != "ok"].itertuples():
+        print(f"error: {row.name}: {row.error}", file=sys.stderr)
+    print(f"{len(pairs)} pairs in {elapsed:.2f} s", file=sys.stderr)
+
+    if (summary["status"] != "ok").any():
+        return EXIT_FAILED_PAIR
+    return EXIT_SPRING_CHANGES if summary["spring_changed"].sum() else EXIT_NO_CHANGES
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import sys
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Hashable, Optional
+
+import pandas as pd
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Compute a stable hexadecimal digest of raw bytes.
+
+    Args:
+        data: Raw content (e.g. the bytes of an uploaded file).
+
+    Returns:
+        SHA-256 hex digest of the content.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Compute a content fingerprint of a DataFrame.
+
+    Two frames with the same columns, dtypes, index and values get the same
+    fingerprint, whatever the object identity.
+
+    Args:
+        df: DataFrame to fingerprint.
+
+    Returns:
+        SHA-256 hex digest of the frame content.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((list(df.columns), [str(t) for t in df.dtypes])).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the in-memory footprint of a cached value in bytes.
+
+    DataFrames and Series are measured with deep memory usage, bytes are
+    measured by length and containers are measured recursively.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (tuple, list, deque)):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+# every LRU cache of the process (see `is_cached` and `cached_bytes`)
+_CACHES: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+
+
+def is_cached(value: Any) -> bool:
+    """Whether `value` itself (not an equal copy) is held by an LRU cache of the process."""
+    return any(cache.holds(value) for cache in list(_CACHES))
+
+
+def cached_bytes() -> int:
+    """Estimated size of the entries of every LRU cache of the process in bytes."""
+    return sum(cache.total_bytes for cache in list(_CACHES))
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by a byte budget.
+
+    Entries are evicted from the least recently used end until the total
+    estimated size fits in `max_bytes`. A single value bigger than the whole
+    budget is never stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: dict = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        _CACHES.add(self)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for `key` (marking it as recently used), or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key` and evict old entries over the budget."""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total += size
+            while self._total > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def holds(self, value: Any) -> bool:
+        """Whether `value` itself (not an equal copy) is one of the cached values."""
+        with self._lock:
+            return any(cached is value for cached in self._entries.values())
+
+    def pop(self, key: Hashable) -> None:
+        """Remove `key` from the cache if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Remove every entry whose key matches `predicate`."""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total = 0
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated size of all cached entries in bytes."""
+        return self._total
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Hashable) -> None:
+        del self._entries[key]
+        self._total -= self._sizes.pop(key)
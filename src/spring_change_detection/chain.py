@@ -0,0 +1,113 @@
+"""
+Spring-change history across N revisions of a PTA file.
+
+    spring-diff-chain w01.xlsx w02.xlsx w03.xlsx --type VP -o timeline.csv
+
+Every revision is read and prepared once (see `diff.generate_chain`) and the
+timeline (one row per car and step, grouped per composite key) is written as
+CSV, Parquet or Excel.
+
+Exit codes: 0 when no spring changed, 1 when spring changes were found,
+2 on invalid input.
+"""
+#__TODO: import libraries_______________________________________________
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+from spring_change_detection.config import INSTRUMENTATION_CONFIG
+from spring_change_detection.parsing import FileHandler
+from spring_change_detection.diff import generate_chain
+from spring_change_detection.instrumentation import log_stages
+
+EXIT_NO_CHANGES = 0
+EXIT_SPRING_CHANGES = 1
+EXIT_INVALID_INPUT = 2
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser of `spring-diff-chain`."""
+    parser = argparse.ArgumentParser(
+        prog="spring-diff-chain",
+        description="Spring-change timeline across ordered revisions of a PTA file.",
+    )
+    parser.add_argument("revisions", type=Path, nargs="+",
+                        help="PTA Excel files, oldest first (at least two)")
+    parser.add_argument("--type", dest="pta_type", choices=("VP", "VU"), default="VP",
+                        help="PTA type selecting the key columns (default: VP)")
+    parser.add_argument("--labels", nargs="+",
+                        help="distinct name of each revision (default: the file names)")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="timeline file to write, .csv, .parquet or .xlsx (default: none)")
+    parser.add_argument("--engine", choices=("merge", "hash"),
+                        help="join engine of the comparison (default: from config)")
+    parser.add_argument("--log-stages", action="store_true",
+                        help="print one JSON line per pipeline stage (SPRING_STAGE_LOG: to a file)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of `spring-diff-chain`.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:]).
+
+    Returns:
+        The process exit code.
+    """
+    args = build_parser().parse_args(argv)
+    log_stages(stderr=args.log_stages, path=INSTRUMENTATION_CONFIG["log_path"])
+    if len(args.revisions) < 2:
+        print("error: at least two revisions are required", file=sys.stderr)
+        return EXIT_INVALID_INPUT
+    labels = args.labels or [path.stem for path in args.revisions]
+    if not args.labels and len(set(labels)) != len(labels):
+        labels = [f"{i + 1}:{label}" for i, label in enumerate(labels)]
+    if len(labels) != len(args.revisions) or len(set(labels)) != len(labels):
+        print("error: give one distinct label per revision", file=sys.stderr)
+        return EXIT_INVALID_INPUT
+
+    start = time.perf_counter()
+    frames = []
+    for path in args.revisions:
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            print(f"error: cannot read {path}: {e}", file=sys.stderr)
+            return EXIT_INVALID_INPUT
+        is_valid, msg, df = FileHandler.validate_excel_file(data, path.name, args.pta_type)
+        if not is_valid:
+            print(f"error: {msg}", file=sys.stderr)
+            return EXIT_INVALID_INPUT
+        frames.append(df)
+    read_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results, timeline = generate_chain(frames, args.pta_type, labels, args.engine)
+    compare_time = time.perf_counter() - start
+
+    if args.output:
+        fmt = args.output.suffix.lower().lstrip(".")
+        if fmt == "parquet":
+            timeline.to_parquet(args.output, index=False)
+        elif fmt == "xlsx":
+            timeline.to_excel(args.output, index=False)
+        else:
+            timeline.to_csv(args.output, index=False)
+        print(f"timeline written to {args.output}", file=sys.stderr)
+
+    for (previous, current), result_df in zip(zip(labels, labels[1:]), results):
+        counts = result_df["Change Type"].value_counts()
+        print(f"{previous} -> {current}: New: {int(counts.get('New', 0))}  "
+              f"Spring Changed: {int(counts.get('Spring Changed', 0))}", file=sys.stderr)
+    print(f"  read     {read_time:8.3f} s\n  compare  {compare_time:8.3f} s", file=sys.stderr)
+
+    spring_changes = (timeline["Change Type"] == "Spring Changed").any()
+    return EXIT_SPRING_CHANGES if spring_changes else EXIT_NO_CHANGES
+
+
+if __name__ == "__main__":
+    sys.exit(main())
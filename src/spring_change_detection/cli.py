@@ -0,0 +1,120 @@
+"""
+Headless comparison of two PTA files, for scheduled pipelines.
+
+Runs the same validation, comparison and export as the Streamlit app in plain
+Python (streamlit is never imported):
+
+    spring-diff old.xlsx new.xlsx --type VP -o report.xlsx
+
+Exit codes: 0 when no spring changed, 1 when spring changes were found,
+2 on invalid input.
+"""
+#__TODO: import libraries_______________________________________________
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import List, Optional
+
+from spring_change_detection.config import INSTRUMENTATION_CONFIG
+from spring_change_detection.parsing import FileHandler
+from spring_change_detection.diff import generate_results_df, summarize_results
+from spring_change_detection.export import OUTPUT_FORMATS, write_report
+from spring_change_detection.instrumentation import log_stages
+
+EXIT_NO_CHANGES = 0
+EXIT_SPRING_CHANGES = 1
+EXIT_INVALID_INPUT = 2
+
+
+#__TODO: Argument parsing_______________________________________________
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser of `spring-diff`."""
+    parser = argparse.ArgumentParser(
+        prog="spring-diff",
+        description="Detect spring changes between an old and a new PTA Excel file.",
+    )
+    parser.add_argument("old", type=Path, help="old PTA Excel file")
+    parser.add_argument("new", type=Path, help="new PTA Excel file")
+    parser.add_argument("--type", dest="pta_type", choices=("VP", "VU"), default="VP",
+                        help="PTA type selecting the key columns (default: VP)")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="report file to write (default: no report)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="report format (default: from the output extension, else xlsx)")
+    parser.add_argument("--engine", choices=("merge", "hash"),
+                        help="join engine of the comparison (default: from config)")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_true",
+                           help="only print errors")
+    verbosity.add_argument("--log-stages", action="store_true",
+                           help="print one JSON line per pipeline stage (SPRING_STAGE_LOG: to a file)")
+    return parser
+
+
+def _output_format(output: Path, fmt: Optional[str]) -> str:
+    """Report format from the --format option or the output file extension."""
+    if fmt:
+        return fmt
+    suffix = output.suffix.lower().lstrip(".")
+    return suffix if suffix in OUTPUT_FORMATS else "xlsx"
+
+
+#__TODO: Main_______________________________________________
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of `spring-diff`.
+
+    Args:
+        argv: Command line arguments (default: sys.argv[1:]).
+
+    Returns:
+        The process exit code.
+    """
+    args = build_parser().parse_args(argv)
+    log_stages(stderr=args.log_stages, path=INSTRUMENTATION_CONFIG["log_path"])
+    timings = {}
+
+    def log(message: str) -> None:
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    frames, new_data = {}, None
+    for label, path in (("old", args.old), ("new", args.new)):
+        start = time.perf_counter()
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            print(f"error: cannot read {label} file: {e}", file=sys.stderr)
+            return EXIT_INVALID_INPUT
+        is_valid, msg, df = FileHandler.validate_excel_file(data, label, args.pta_type)
+        if not is_valid:
+            print(f"error: {msg}", file=sys.stderr)
+            return EXIT_INVALID_INPUT
+        timings[f"read {label}"] = time.perf_counter() - start
+        frames[label] = df
+        if label == "new":
+            new_data = data
+
+    start = time.perf_counter()
+    results_df = generate_results_df(frames["old"], frames["new"], args.pta_type, args.engine)
+    timings["compare"] = time.perf_counter() - start
+
+    if args.output:
+        fmt = _output_format(args.output, args.format)
+        start = time.perf_counter()
+        write_report(results_df, new_data, args.output, fmt)
+        timings[f"export {fmt}"] = time.perf_counter() - start
+        log(f"report written to {args.output}")
+
+    summary = summarize_results(results_df)
+    log(f"rows: {summary['total_cars']}  New: {summary['new']}  "
+        f"Spring Changed: {summary['spring_changed']}  Unchanged: {summary['unchanged']}")
+    for stage, seconds in timings.items():
+        log(f"  {stage:<14} {seconds:8.3f} s")
+
+    return EXIT_SPRING_CHANGES if summary["spring_changed"] else EXIT_NO_CHANGES
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Configuration of the comparison engine (parsing, diff and export).
+"""
+import os
+from pathlib import Path
+
+# ─── Upload restrictions ──────────────────────────────────────────────────────
+UPLOAD_CONFIG = {
+    "allowed_extension": ['xlsx', 'xls'],
+    "max_file_size" : 200,  # MB
+    "sheet_name": "PTA",
+    "skip_rows": [1]
+    }
+
+# ─── Cache settings ───────────────────────────────────────────────────────────
+CACHE_CONFIG = {
+    # memory budget (bytes) for parsed PTA sheets shared by all sessions
+    "parse_cache_max_bytes": 1024 * 1024 * 1024,
+    # memory budget (bytes) for comparison results shared by all sessions
+    "results_cache_max_bytes": 256 * 1024 * 1024,
+    # memory budget (bytes) for finished Excel reports shared by all sessions
+    "report_cache_max_bytes": 512 * 1024 * 1024,
+    # memory budget (bytes) for downscaled workbook images shared by all sessions
+    "image_cache_max_bytes": 64 * 1024 * 1024,
+    }
+
+# ─── Persistent store ─────────────────────────────────────────────────────────
+STORE_CONFIG = {
+    # keep parsed PTA sheets on disk (Arrow files) for every process of the server;
+    # on when SPRING_STORE_DIR is set, and always in the Streamlit app (see app.py)
+    "enabled": bool(os.environ.get("SPRING_STORE_DIR")),
+    # folder of the store, shared by the processes reading the same files
+    "directory": Path(os.environ.get(
+        "SPRING_STORE_DIR", Path.home() / ".cache" / "spring_change_detection" / "store"
+    )),
+    # disk budget (bytes); the least recently used files are deleted above it
+    "max_bytes": 2 * 1024 * 1024 * 1024,
+    }
+
+# ─── Instrumentation ──────────────────────────────────────────────────────────
+INSTRUMENTATION_CONFIG = {
+    # time every pipeline stage and log it as one JSON line
+    "enabled": True,
+    # also measure the peak memory of every stage with tracemalloc (slower)
+    "trace_memory": os.environ.get("SPRING_TRACE_MEMORY", "") not in ("", "0"),
+    # file receiving the JSON lines, in addition to the standard logging handlers
+    "log_path": os.environ.get("SPRING_STAGE_LOG"),
+    # stage records kept per session for the diagnostics panel
+    "session_records": 200,
+    }
+
+# ─── Comparison settings ──────────────────────────────────────────────────────
+DIFF_CONFIG = {
+    # "merge": pandas outer merge on the key columns
+    # "hash": join on 64-bit row fingerprints of the key columns
+    "join_engine": "merge",
+    # join only the rows that differ between old and new (identical rows are Unchanged)
+    "incremental": True,
+    }
+
+# ─── Excel export ─────────────────────────────────────────────────────────────
+EXPORT_CONFIG = {
+    # "xml": patch the PTA sheet XML in the .xlsx zip (fast, low memory)
+    # "openpyxl": load and re-save the whole workbook
+    "engine": "xml",
+    # "fill": style every cell of the highlighted rows
+    # "conditional": hidden change-type column + conditional formatting rules
+    "highlight_mode": "fill",
+    # fill color (RGB hex) of the highlighted rows of the PTA sheet
+    "highlight_colors": {
+        "New": "FF5733",
+        "Spring Changed": "B4C6E7",
+    },
+    # background threads building reports for all sessions
+    "workers": 2,
+    }
+
+# ─── Batch comparison ─────────────────────────────────────────────────────────
+BATCH_CONFIG = {
+    # worker processes comparing pairs in parallel (None: one per CPU)
+    "workers": None,
+    # upper bound of the worker processes of one batch (None: one per CPU)
+    "max_workers": None,
+    # folder holding the manifests, PTA files and reports the app may use;
+    # the batch page of the app is disabled when it is not set
+    "root": Path(os.environ["SPRING_BATCH_ROOT"]) if os.environ.get("SPRING_BATCH_ROOT") else None,
+    # file name prefixes identifying the old and new file of a pair folder
+    "old_prefix": "old",
+    "new_prefix": "new",
+    }
+
+# ─── Columns Data ────────────────────────────────────────────────────
+REQUIRED_COLUMNS: dict = {
+    "mass": "Masse suspendue en charge de référence",
+    "reference": "Référence"
+}
+
+VP_COLUMNS_KEY: list = [
+        "Moteur", "Boite", "Niveau",
+        "Plaque de protection tôle sous GMP",
+        "Pavillon multifonction", "2e PLC Gauche",
+        "Chauffage additionnel type WEBASTO"   
+        ]
+
+VU_COLUMNS_KEY: list =[
+    "Moteur", "Boite", "Niveau", "Plaque de conception"
+]
+
+# dtypes used when reading the PTA columns that take part in the comparison
+COLUMN_DTYPES: dict = {
+    "key": "category",
+    "reference": "str",
+    "mass": "float64",
+}
@@ -0,0 +1,752 @@
+
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from spring_change_detection.config import REQUIRED_COLUMNS,VP_COLUMNS_KEY, VU_COLUMNS_KEY, CACHE_CONFIG, DIFF_CONFIG
+from spring_change_detection.cache import LRUCache, frame_fingerprint
+from spring_change_detection.instrumentation import stage
+
+# comparison results keyed by (old fingerprint, new fingerprint, PTA type)
+_RESULTS_CACHE = LRUCache(CACHE_CONFIG["results_cache_max_bytes"])
+
+#__TODO: Clean the dataframe_________________________________
+def clean_dataframe(
+    df: pd.DataFrame,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Normalize DataFrame columns:
+      - Convert all-X columns to 0/1 integers
+      - Strip and lowercase text columns
+      - Fill other NaNs with zeros
+
+    Text categorical columns (typed key columns) are normalized on their
+    categories and stay categorical; numeric ones are normalized like the
+    plain columns their values would have been read as.
+
+    Checkbox detection runs on all text columns at once, and only `columns`
+    are normalized: the other columns are kept raw and the frame is not deep-copied.
+
+    Args:
+        df: Input DataFrame to clean.
+        columns: Columns to normalize (default: all columns).
+
+    Returns:
+        A new DataFrame with cleaned data.
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+
+    series, cleaned = {}, {}
+    for col in columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            if not pd.api.types.is_numeric_dtype(s.cat.categories.infer_objects()):
+                cleaned[col] = _clean_categorical(s)
+                continue
+            s = s.astype(object).infer_objects()
+        series[col] = s
+
+    text_cols = [col for col, s in series.items() if pd.api.types.is_object_dtype(s)]
+    other_cols = [col for col in series if col not in set(text_cols)]
+
+    if text_cols:
+        # checkbox columns: every non-empty value is 'X' (case-insensitive) → 1, else 0
+        values = np.column_stack([series[col].to_numpy(dtype=object) for col in text_cols])
+        is_x = (values == "X") | (values == "x")
+        is_checkbox = (is_x | pd.isna(values)).all(axis=0)
+        for i, col in enumerate(text_cols):
+            if is_checkbox[i]:
+                cleaned[col] = pd.Series(is_x[:, i].astype(int), index=df.index)
+            # strip whitespace & lowercase text
+            else:
+                cleaned[col] = _per_distinct(
+                    series[col].fillna('').astype(str), lambda v: v.str.strip().str.lower()
+                )
+
+    for col in other_cols:
+        s = series[col]
+        # columns without any value are treated as empty checkbox columns
+        if s.isna().all():
+            cleaned[col] = pd.Series(np.zeros(len(s), dtype=int), index=df.index)
+        # fill other missing values with 0
+        elif s.hasnans:
+            cleaned[col] = s.fillna(0)
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            cleaned[col] = s
+
+    out = df.copy(deep=False)
+    for col, s in cleaned.items():
+        out[col] = s
+    return out
+
+def _clean_categorical(s: pd.Series) -> pd.Series:
+    """
+    Apply the `clean_dataframe` rules to a text categorical column through its categories.
+
+    Checkbox columns become 0/1 integers; other columns stay categorical with
+    stripped, lowercased categories and '' for missing values.
+    """
+    categories = s.cat.categories.to_numpy(dtype=object)
+    codes = s.cat.codes.to_numpy()
+    present = codes >= 0
+
+    # checkbox: every used category is 'X' (case-insensitive) → 1, else 0
+    # (the extra last entry is indexed by the -1 code of missing values)
+    category_is_x = np.append((categories == "X") | (categories == "x"), False)
+    if category_is_x[np.unique(codes[present])].all():
+        return pd.Series(category_is_x[codes].astype(int), index=s.index)
+
+    # strip whitespace & lowercase text, merging categories that become equal
+    normalized = pd.Series(categories, dtype=object).astype(str).str.strip().str.lower()
+    category_codes, uniques = pd.factorize(normalized)
+    if not present.all():
+        if "" not in uniques:
+            uniques = uniques.append(pd.Index([""]))
+        category_codes = np.append(category_codes, uniques.get_loc(""))
+    return pd.Series(
+        pd.Categorical.from_codes(category_codes[codes], categories=uniques),
+        index=s.index
+    )
+
+def _per_distinct(s: pd.Series, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """
+    Apply a string transformation once per distinct value of a str Series.
+
+    Text columns repeat few distinct values (references, options), so the
+    distinct values are transformed and taken back by code instead of
+    transforming every row.
+    """
+    codes, uniques = pd.factorize(s.to_numpy(dtype=object))
+    values = transform(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(values[codes], index=s.index)
+
+#__TODO: Encode key columns_________________________________
+def encode_keys(old: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> None:
+    """
+    Encode the key columns of both frames against one shared categorical dictionary.
+
+    Both frames then store every key as integer codes into the same
+    categories, so sequencing and joining compare codes instead of strings,
+    and the codes carry through to the result frame. Frames are updated in place.
+
+    Args:
+        old, new: Cleaned frames being compared.
+        keys: Composite key columns.
+    """
+    _encode_frames([old, new], keys)
+
+def _encode_frames(frames: List[pd.DataFrame], keys: List[str]) -> None:
+    """Encode the key columns of any number of frames against shared dictionaries, in place."""
+    for k in keys:
+        values = [
+            df[k].cat.categories if isinstance(df[k].dtype, pd.CategoricalDtype)
+            else pd.Index(df[k].unique())
+            for df in frames
+        ]
+        categories = values[0].append(values[1:]).unique()
+        for df in frames:
+            # astype is a no-op for the same categories in another order
+            # (CategoricalDtype equality ignores it), and codes would then differ
+            if isinstance(df[k].dtype, pd.CategoricalDtype):
+                df[k] = df[k].cat.set_categories(categories)
+            else:
+                df[k] = pd.Categorical(df[k], categories=categories)
+
+def _shared_dtypes(old: pd.DataFrame, new: pd.DataFrame, columns: List[str]) -> bool:
+    """
+    Whether the columns have the same dtypes in both frames, categoricals with
+    the same categories in the same order, so that equal codes are equal values.
+    """
+    for col in columns:
+        if old[col].dtype != new[col].dtype:
+            return False
+        if (isinstance(old[col].dtype, pd.CategoricalDtype)
+                and not old[col].cat.categories.equals(new[col].cat.categories)):
+            return False
+    return True
+
+#__TODO: Classify the merged records_________________________________
+def classify_changes(
+    merged: pd.DataFrame,
+    ref_old: str,
+    ref_new: str,
+    mass_old: str,
+    mass_new: str
+) -> None:
+    """
+    Add the mass and reference statuses and the change type to a merged frame.
+
+    Vectorized over whole columns (sign of the mass difference, masks on the
+    reference comparison and the merge indicator) instead of row-wise apply.
+
+    Adds the columns:
+      - Mass Difference: new mass minus old mass
+      - Mass Status: Increased / Decreased / Unchanged
+      - Reference Status: Change / No Change
+      - Change Type: New (right_only rows), Spring Changed or Unchanged
+
+    Args:
+        merged: Outer merge of old and new with a `_merge` indicator column.
+        ref_old, ref_new: Normalized reference columns.
+        mass_old, mass_new: Mass columns filled with zeros.
+    """
+    merged["Mass Difference"] = merged[mass_new] - merged[mass_old]
+    sign = np.sign(merged["Mass Difference"].to_numpy())
+    merged["Mass Status"] = np.select(
+        [sign > 0, sign < 0], ["Increased", "Decreased"], default="Unchanged"
+    ).astype(object)
+
+    ref_changed = merged[ref_old].to_numpy() != merged[ref_new].to_numpy()
+    merged["Reference Status"] = np.where(ref_changed, "Change", "No Change").astype(object)
+
+    # 'left_only' rows (deleted cars) are dropped by the caller
+    is_new = (merged["_merge"] == "right_only").to_numpy()
+    merged["Change Type"] = np.select(
+        [is_new, ref_changed], ["New", "Spring Changed"], default="Unchanged"
+    ).astype(object)
+
+#__TODO: Generate the result_________________________________
+def generate_results_df(
+    old_df: pd.DataFrame,
+    new_df: pd.DataFrame,
+    pta_type: str = "VP",
+    engine: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> pd.DataFrame:
+    """
+    Compare old and new PTA DataFrames to detect spring changes.
+
+    Steps:
+      1. Determine composite key columns by PTA type. (VP, VU)
+      2. Clean the compared columns (keys, reference, mass) of both DataFrames.
+      3. Annotate original Excel row numbers
+      4. Encode keys against a shared dictionary and sequence duplicates
+         to handle identical keys.
+      5. Perform full outer merge on keys + sequence.
+      6. Normalize reference strings and mass columns.
+      7. Compute mass differences/status and detect reference changes.
+      8. Classify each record as New, Spring Changed, or Unchanged.
+      9. assemble result and select metadata columns
+
+    Results are memoized on the content fingerprints of both inputs and the
+    PTA type, so unchanged inputs never trigger a recomputation. The returned
+    DataFrame is shared between callers and must not be modified in place.
+
+    In incremental mode, rows identical in both revisions (same cleaned key,
+    duplicate sequence, reference and mass) are matched on row hashes and
+    taken straight through as Unchanged, and only the other rows go through
+    the join of step 5. Identical inputs are prepared once and never joined.
+
+    Args:
+        old_df: Original PTA DataFrame.
+        new_df: Updated PTA DataFrame.
+        pta_type: Either "VP" or "VU" to select appropriate key columns.
+        engine: Join engine for step 4-5, "merge" (pandas merge on the key
+            columns) or "hash" (join on 64-bit row fingerprints). Both give the
+            same output; defaults to DIFF_CONFIG["join_engine"].
+        incremental: Join only the rows that differ; gives the same output,
+            defaults to DIFF_CONFIG["incremental"].
+
+    Returns:
+        A DataFrame with comparison metadata and change classification.
+    """
+    key = (frame_fingerprint(old_df), frame_fingerprint(new_df), pta_type)
+    result_df = _RESULTS_CACHE.get(key)
+    if result_df is None:
+        result_df = _compare(old_df, new_df, pta_type, engine, incremental, key[0] == key[1])
+        _RESULTS_CACHE.put(key, result_df)
+    return result_df
+
+#__TODO: Summarize the result_________________________________
+def summarize_results(result_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Headline figures of a comparison (the metrics of the analysis overview).
+
+    Args:
+        result_df: Comparison result from `generate_results_df`.
+
+    Returns:
+        Dict with the number of cars in the result and of New, Spring Changed
+        and Unchanged cars, the fleet mass change and the total old + new mass.
+    """
+    counts = result_df["Change Type"].value_counts()
+    return {
+        "total_cars": len(result_df),
+        "new": int(counts.get("New", 0)),
+        "spring_changed": int(counts.get("Spring Changed", 0)),
+        "unchanged": int(counts.get("Unchanged", 0)),
+        "fleet_mass_change": float(result_df["Mass Difference"].sum()),
+        "fleet_mass_total": float(result_df["New Mass"].sum() + result_df["Old Mass"].sum()),
+    }
+
+#__TODO: Compare a chain of revisions_________________________________
+def generate_chain(
+    frames: List[pd.DataFrame],
+    pta_type: str = "VP",
+    labels: Optional[List[str]] = None,
+    engine: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> Tuple[List[pd.DataFrame], pd.DataFrame]:
+    """
+    Compare an ordered list of PTA revisions, each with the next one.
+
+    Every revision is cleaned, annotated and sequenced exactly once, and all
+    revisions share one key dictionary, so a middle revision's prepared frame
+    serves both as the new side of one comparison and the old side of the
+    next. Each step gives the same rows as `generate_results_df` on that pair.
+    The key columns are those every revision has.
+
+    Args:
+        frames: PTA DataFrames, oldest first (at least two).
+        pta_type: Either "VP" or "VU" to select appropriate key columns.
+        labels: Distinct name of each revision (default: "1", "2", ...).
+        engine: Join engine, see `generate_results_df`.
+        incremental: Join only the rows that differ, see `generate_results_df`.
+
+    Returns:
+        Tuple containing:
+          - the comparison result of each step (revision i → i + 1)
+          - the change timeline, see `chain_timeline`
+    """
+    if len(frames) < 2:
+        raise ValueError("A chain needs at least two revisions.")
+    labels = list(labels) if labels is not None else [str(i + 1) for i in range(len(frames))]
+    if len(labels) != len(frames) or len(set(labels)) != len(labels):
+        raise ValueError("One distinct label per revision is required.")
+
+    keys = _key_columns(frames, pta_type)
+    prepared = [_prepare(df, keys) for df in frames]
+    _encode_frames(prepared, keys)
+
+    results = []
+    occurrences = []
+    for old, new in zip(prepared, prepared[1:]):
+        result_df = _compare_prepared(old, new, keys, engine, incremental)
+        results.append(result_df)
+        # duplicate-key occurrence of each car, from the sequence of its new row
+        seq_by_id = pd.Series(new["__seq"].to_numpy(), index=new["__id"].to_numpy())
+        occurrences.append(seq_by_id.reindex(result_df["Cell ID New"].to_numpy()).to_numpy())
+
+    return results, chain_timeline(results, labels, keys, occurrences)
+
+def chain_timeline(
+    results: List[pd.DataFrame],
+    labels: List[str],
+    keys: List[str],
+    occurrences: List[np.ndarray]
+) -> pd.DataFrame:
+    """
+    Stack the step results of a chain into one change timeline per composite key.
+
+    Args:
+        results: Comparison result of each step (revision i → i + 1).
+        labels: Name of each revision.
+        keys: Composite key columns.
+        occurrences: Duplicate-key occurrence of every row of each result.
+
+    Returns:
+        One row per car and step, sorted by key, occurrence and revision, with
+        the revision the change was seen in ('Revision') and the one before
+        ('Previous Revision'); grouping on the keys and 'Occurrence' gives the
+        timeline of each car.
+    """
+    revision = pd.CategoricalDtype(labels, ordered=True)
+    steps = []
+    for i, (result_df, occurrence) in enumerate(zip(results, occurrences)):
+        step = result_df.assign(**{
+            'Occurrence': occurrence,
+            'Previous Revision': pd.Categorical([labels[i]] * len(result_df), dtype=revision),
+            'Revision': pd.Categorical([labels[i + 1]] * len(result_df), dtype=revision),
+        })
+        steps.append(step)
+    timeline = pd.concat(steps, ignore_index=True)
+    columns = keys + ['Occurrence', 'Previous Revision', 'Revision'] + [
+        c for c in results[0].columns if c not in keys
+    ]
+    return (
+        timeline[columns]
+        .sort_values(keys + ['Occurrence', 'Revision'], kind="stable")
+        .reset_index(drop=True)
+    )
+
+#__TODO: Invalidate cached results__________________________________
+def invalidate_results(df: pd.DataFrame) -> None:
+    """
+    Drop every cached comparison that involves `df` (e.g. a replaced upload).
+
+    Args:
+        df: Input PTA DataFrame that is no longer current.
+    """
+    fingerprint = frame_fingerprint(df)
+    _RESULTS_CACHE.discard_where(lambda key: fingerprint in key[:2])
+
+def _compare(
+    old_df: pd.DataFrame,
+    new_df: pd.DataFrame,
+    pta_type: str,
+    engine: Optional[str] = None,
+    incremental: Optional[bool] = None,
+    identical: bool = False
+) -> pd.DataFrame:
+    """
+    Run the full comparison pipeline described in `generate_results_df`.
+
+    `identical` tells that both inputs have the same content, in which case
+    the incremental mode prepares a single frame for both sides.
+    """
+    incremental = DIFF_CONFIG["incremental"] if incremental is None else incremental
+
+    #__TODO: Choose composite-key columns___________________________________
+    keys = _key_columns([old_df, new_df], pta_type)
+    
+    #__TODO: Clean, annotate and sequence both dataframes____________________
+    old = _prepare(old_df, keys)
+    new = old if identical and incremental else _prepare(new_df, keys)
+    
+    #__TODO: Encode keys against a shared dictionary_________________________
+    encode_keys(old, new, keys)
+    
+    return _compare_prepared(old, new, keys, engine, incremental)
+
+def _key_columns(frames: List[pd.DataFrame], pta_type: str) -> List[str]:
+    """Composite key columns of a PTA type that every frame has."""
+    keys = VP_COLUMNS_KEY if pta_type == "VP" else VU_COLUMNS_KEY
+    return [k for k in keys if all(k in df.columns for df in frames)]
+
+def _prepare(df: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Clean the compared columns of a PTA frame, annotate the Excel row numbers
+    (`__id`) and sequence duplicate keys (`__seq`).
+
+    A prepared frame only depends on its own input, so it can serve as the
+    new side of one comparison and the old side of the next.
+    """
+    compared = keys + [REQUIRED_COLUMNS["reference"], REQUIRED_COLUMNS["mass"]]
+    with stage("clean") as record:
+        frame = clean_dataframe(df[compared])
+        record["rows"], record["columns"] = frame.shape
+    with stage("sequence") as record:
+        frame["__id"] = frame.index + 3
+        frame["__seq"] = frame.groupby(keys, observed=True).cumcount()
+        record["rows"], record["columns"] = frame.shape
+    return frame
+
+def _compare_prepared(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    keys: List[str],
+    engine: Optional[str] = None,
+    incremental: Optional[bool] = None
+) -> pd.DataFrame:
+    """Join, classify and assemble two prepared frames with shared key dictionaries."""
+    engine = engine or DIFF_CONFIG["join_engine"]
+    if engine not in ("merge", "hash"):
+        raise ValueError(f"Unknown join engine: {engine!r}")
+    incremental = DIFF_CONFIG["incremental"] if incremental is None else incremental
+
+    #__TODO: Join old/new on keys + sequence_________________________________
+    with stage("merge", engine=engine, incremental=incremental) as record:
+        pairs = _identical_rows(old, new, keys) if incremental else None
+        old = old.rename(columns={"__id": "__old_id"})
+        new = new.rename(columns={"__id": "__new_id"})
+        if pairs is None:
+            merged = _join(old, new, keys, engine)
+        else:
+            merged = _join_incremental(old, new, keys, engine, *pairs)
+            record["identical_rows"] = len(pairs[0])
+        record["rows"], record["columns"] = merged.shape
+
+    with stage("classify") as record:
+        result_df = _classify_merged(merged, keys)
+        record["rows"], record["columns"] = result_df.shape
+    return result_df
+
+def _classify_merged(merged: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """Normalize, classify and assemble the joined frame into the result frame."""
+    #__TODO: Normalize reference string and mass columns _______________________
+    ref_old = f"{REQUIRED_COLUMNS['reference']}_old"
+    ref_new = f"{REQUIRED_COLUMNS['reference']}_new"
+    mass_old = f"{REQUIRED_COLUMNS['mass']}_old"
+    mass_new = f"{REQUIRED_COLUMNS['mass']}_new"
+
+    for col in (ref_old, ref_new):
+        ref = merged[col]
+        # references read without the typed schema come back as floats ("123.0")
+        repair_float = pd.api.types.is_numeric_dtype(ref)
+        merged[col] = _per_distinct(
+            ref.fillna("").astype(str),
+            lambda v, repair_float=repair_float: (
+                v.str.replace(r"\.0$", "", regex=True) if repair_float else v
+            ).str.strip()
+        )
+
+    merged[mass_old] = merged.get(mass_old, 0).fillna(0).astype(float)
+    merged[mass_new] = merged.get(mass_new, 0).fillna(0).astype(float)
+    
+    #__TODO: Compute mass differences/status and detect reference changes __________
+    #__TODO: Classify each record as New, Spring Changed or Unchanged _______________
+    classify_changes(merged, ref_old, ref_new, mass_old, mass_new)
+    
+    # filter out deleted cars
+    merged = merged[merged["_merge"] != "left_only"]
+    
+    #__TODO: Assemble data _________________________________________________________
+    
+    result_cols = keys + [
+        ref_new, ref_old, mass_new, mass_old,
+        'Mass Difference', 'Mass Status', 'Reference Status', 'Change Type',
+        '__new_id', '__old_id'
+    ]
+    result_df = merged[result_cols].rename(columns={
+        ref_new: 'New Reference',
+        ref_old: 'Old Reference',
+        mass_new: 'New Mass',
+        mass_old: 'Old Mass',
+        '__new_id': 'Cell ID New',
+        '__old_id': 'Cell ID Old'
+    })
+
+    # sort ascending by the new-cell ID
+    return result_df.sort_values('Cell ID New', ascending=True).reset_index(drop=True)
+
+
+#__TODO: Join engines_________________________________
+def _join(old: pd.DataFrame, new: pd.DataFrame, keys: List[str], engine: str) -> pd.DataFrame:
+    """Join old/new with `engine`, falling back to the merge engine."""
+    merged = _join_hashed(old, new, keys) if engine == "hash" else None
+    if merged is None:
+        merged = _join_merged(old, new, keys)
+    return merged
+
+def _join_merged(old: pd.DataFrame, new: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    Full outer merge old/new on the key columns and duplicate sequence.
+
+    Args:
+        old, new: Prepared frames with row ids.
+        keys: Composite key columns.
+
+    Returns:
+        The merged frame with `_old`/`_new` suffixes and a `_merge` indicator.
+    """
+    return pd.merge(
+        old, new,
+        on = keys + ['__seq'],
+        how="outer",
+        suffixes = ("_old", "_new"),
+        indicator=True
+    )
+
+def _join_hashed(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    keys: List[str]
+) -> Optional[pd.DataFrame]:
+    """
+    Join old/new on 64-bit row fingerprints and duplicate sequence.
+
+    The composite key of each row is hashed into a uint64, so the join runs
+    on integers instead of wide string keys. Deleted cars are
+    never materialized, and the output matches `_join_merged` once its
+    'left_only' rows are dropped.
+
+    Args:
+        old, new: Prepared frames with row ids.
+        keys: Composite key columns.
+
+    Returns:
+        The merged frame, or None when fingerprints cannot stand in for the
+        keys (key dtypes or dictionaries differ, or two different keys collide).
+    """
+    if not _shared_dtypes(old, new, keys):
+        return None
+
+    fingerprints = _row_fingerprints(old, new, keys)
+    if fingerprints is None:
+        return None
+    old_fp, new_fp = fingerprints[:len(old)], fingerprints[len(old):]
+
+    reference, mass = REQUIRED_COLUMNS["reference"], REQUIRED_COLUMNS["mass"]
+    old_side = pd.DataFrame({
+        "__fp": old_fp,
+        "__seq": old["__seq"].to_numpy(),
+        f"{reference}_old": old[reference].to_numpy(),
+        f"{mass}_old": old[mass].to_numpy(),
+        "__old_id": old["__old_id"].to_numpy(),
+    })
+    new_side = new[keys + [reference, mass, "__new_id", "__seq"]].rename(columns={
+        reference: f"{reference}_new",
+        mass: f"{mass}_new",
+    })
+    new_side["__fp"] = new_fp
+
+    merged = new_side.merge(old_side, on=["__fp", "__seq"], how="left", indicator=True)
+    matched = merged["_merge"] == "both"
+    merged["_merge"] = np.where(matched, "both", "right_only")
+    # the outer merge turns new ids into floats when deleted cars leave gaps
+    if matched.sum() < len(old):
+        merged["__new_id"] = merged["__new_id"].astype(float)
+    return merged.drop(columns=["__fp", "__seq"])
+
+def _row_fingerprints(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    keys: List[str]
+) -> Optional[np.ndarray]:
+    """
+    Turn the composite key of every old then new row into a 64-bit fingerprint.
+
+    Each key column is factorized once over both frames (categorical keys
+    sharing a dictionary use their codes directly). The codes are packed
+    exactly (mixed radix) when the key space fits in 63 bits, and hashed
+    otherwise, in which case collisions are checked on the codes.
+
+    Returns:
+        Fingerprints of the old rows followed by the new rows, or None on a collision.
+    """
+    codes, cardinalities = [], []
+    for k in keys:
+        if isinstance(old[k].dtype, pd.CategoricalDtype):
+            # shared dictionary (see encode_keys): the codes already identify the keys
+            key_codes = np.concatenate([old[k].cat.codes, new[k].cat.codes]).astype(np.int64)
+            cardinality = len(old[k].cat.categories) + 1
+            key_codes[key_codes < 0] = cardinality - 1
+        else:
+            key_codes, uniques = pd.factorize(
+                np.concatenate([old[k].to_numpy(), new[k].to_numpy()]),
+                use_na_sentinel=False
+            )
+            cardinality = max(len(uniques), 1)
+        codes.append(key_codes.astype(np.uint64))
+        cardinalities.append(cardinality)
+
+    if np.prod(cardinalities, dtype=object) < 2 ** 63:
+        fingerprints = np.zeros(len(old) + len(new), dtype=np.uint64)
+        for key_codes, cardinality in zip(codes, cardinalities):
+            fingerprints = fingerprints * np.uint64(cardinality) + key_codes
+        return fingerprints
+
+    fingerprints = pd.util.hash_pandas_object(
+        pd.DataFrame(dict(enumerate(codes))), index=False
+    ).to_numpy()
+    if _has_collision(fingerprints, codes):
+        return None
+    return fingerprints
+
+#__TODO: Incremental join_________________________________
+def _identical_rows(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    keys: List[str]
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Find the rows whose compared values are identical in old and new.
+
+    Keys plus duplicate sequence are unique within a frame, so a new row
+    with the same key, sequence, reference and mass as an old row is exactly
+    the row the join would pair it with, and is Unchanged. Rows are matched
+    on 64-bit hashes of these columns and every match is confirmed on the
+    values, so a hash collision only sends the row through the join.
+
+    Args:
+        old, new: Prepared frames with row ids and shared key dictionaries.
+        keys: Composite key columns.
+
+    Returns:
+        Positions of the identical rows in old and in new, pairwise, or None
+        when the rows cannot be matched on hashes (column dtypes or key
+        dictionaries differ).
+    """
+    columns = keys + ["__seq", REQUIRED_COLUMNS["reference"], REQUIRED_COLUMNS["mass"]]
+    if old is new:
+        positions = np.arange(len(new))
+        return positions, positions
+    if not _shared_dtypes(old, new, columns):
+        return None
+
+    old_hash = pd.Index(pd.util.hash_pandas_object(old[columns], index=False).to_numpy())
+    if not old_hash.is_unique:
+        return None
+    new_hash = pd.util.hash_pandas_object(new[columns], index=False).to_numpy()
+    old_pos = old_hash.get_indexer(new_hash)
+    new_pos = np.flatnonzero(old_pos >= 0)
+    old_pos = old_pos[new_pos]
+
+    same = np.ones(len(new_pos), dtype=bool)
+    for col in columns:
+        if isinstance(new[col].dtype, pd.CategoricalDtype):
+            # shared dictionary (see encode_keys): equal codes are equal keys
+            a = old[col].cat.codes.to_numpy()[old_pos]
+            b = new[col].cat.codes.to_numpy()[new_pos]
+            same &= a == b
+        else:
+            a = old[col].to_numpy()[old_pos]
+            b = new[col].to_numpy()[new_pos]
+            equal = a == b
+            differ = ~equal
+            equal[differ] = pd.isna(a[differ]) & pd.isna(b[differ])
+            same &= equal
+    return old_pos[same], new_pos[same]
+
+def _join_incremental(
+    old: pd.DataFrame,
+    new: pd.DataFrame,
+    keys: List[str],
+    engine: str,
+    old_pos: np.ndarray,
+    new_pos: np.ndarray
+) -> pd.DataFrame:
+    """
+    Join only the rows that are not identical, and add the identical pairs as matched rows.
+
+    Removing pairs that would join with each other leaves the join of the
+    other rows unchanged, so the output matches `_join` on the whole frames,
+    with the row ids cast to float exactly when the whole join would.
+
+    Args:
+        old, new: Prepared frames with row ids (`__old_id`, `__new_id`).
+        keys: Composite key columns.
+        engine: Join engine of the rows that differ.
+        old_pos, new_pos: Positions of the identical rows, from `_identical_rows`.
+
+    Returns:
+        The merged frame with `_old`/`_new` suffixes and a `_merge` indicator.
+    """
+    reference, mass = REQUIRED_COLUMNS["reference"], REQUIRED_COLUMNS["mass"]
+    same = new[keys + ["__new_id"]].iloc[new_pos].reset_index(drop=True)
+    same["__old_id"] = old["__old_id"].to_numpy()[old_pos]
+    for col in (reference, mass):
+        same[f"{col}_old"] = old[col].to_numpy()[old_pos]
+        same[f"{col}_new"] = new[col].to_numpy()[new_pos]
+    same["_merge"] = "both"
+
+    parts = [same]
+    old_rest = np.ones(len(old), dtype=bool)
+    old_rest[old_pos] = False
+    new_rest = np.ones(len(new), dtype=bool)
+    new_rest[new_pos] = False
+    if old_rest.any() or new_rest.any():
+        parts.append(_join(old[old_rest], new[new_rest], keys, engine))
+    merged = pd.concat([part for part in parts if len(part)] or parts, ignore_index=True)
+
+    # ids of a side turn into floats when the other side has unmatched rows
+    matched = int((merged["_merge"] == "both").sum())
+    merged["__new_id"] = merged["__new_id"].astype(float if matched < len(old) else np.int64)
+    merged["__old_id"] = merged["__old_id"].astype(float if matched < len(new) else np.int64)
+    return merged
+
+def _has_collision(fingerprints: np.ndarray, key_codes: List[np.ndarray]) -> bool:
+    """
+    Check whether two different composite keys share a fingerprint.
+
+    Rows are ordered by fingerprint; neighbours with the same fingerprint
+    must then have the same code in every key column.
+    """
+    order = np.argsort(fingerprints, kind="stable")
+    sorted_fp = fingerprints[order]
+    same_fp = sorted_fp[1:] == sorted_fp[:-1]
+    for codes in key_codes:
+        codes = codes[order]
+        if (same_fp & (codes[1:] != codes[:-1])).any():
+            return True
+    return False
@@ -0,0 +1,215 @@
+"""
+Excel export: a copy of the new PTA workbook with the changed rows highlighted.
+
+openpyxl is imported on first use only; the default xml engine does not need it.
+"""
+#__TODO: import libraries_______________________________________________
+import io
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+import pandas as pd
+from spring_change_detection.config import UPLOAD_CONFIG, EXPORT_CONFIG
+from spring_change_detection.parsing import FileHandler
+from spring_change_detection import xlsx_patch
+from spring_change_detection.instrumentation import stage
+
+# report formats of write_report
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+
+
+@lru_cache(maxsize=1)
+def _highlight_fills() -> Dict[str, Any]:
+    """One fill per change type, shared by every highlighted cell."""
+    from openpyxl.styles import PatternFill
+
+    return {
+        change_type: PatternFill('solid', fgColor=color)
+        for change_type, color in EXPORT_CONFIG["highlight_colors"].items()
+    }
+
+
+#__TODO: Create the excel output _______________________________________________
+def build_excel_report(
+    data: bytes,
+    results_df: pd.DataFrame,
+    highlight_mode: Optional[str] = None,
+    engine: Optional[str] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> bytes:
+    """
+    Highlight the changed rows of the PTA sheet in a copy of the original workbook.
+
+    Rows are matched through a Cell ID → change type lookup built once, so
+    the export grows linearly with the number of rows.
+
+    Highlight modes:
+      - "fill": every cell of a highlighted row gets the shared fill of its change type.
+      - "conditional": a hidden helper column holds the change type and one
+        conditional formatting rule per change type colors the rows, which
+        replaces the per-cell style writes with a handful of rules.
+
+    Engines:
+      - "xml": patch styles.xml and stream-rewrite the PTA sheet XML inside
+        the zip, copying every other part unchanged (fill mode only).
+      - "openpyxl": load, edit and re-save the whole workbook.
+    The xml engine falls back to openpyxl for files it cannot patch.
+
+    Args:
+        data: Raw bytes of the new PTA Excel file.
+        results_df: Comparison result with 'Cell ID New' and 'Change Type'.
+        highlight_mode: "fill" or "conditional" (default: EXPORT_CONFIG["highlight_mode"]).
+        engine: "xml" or "openpyxl" (default: EXPORT_CONFIG["engine"]).
+        on_progress: Optional callback receiving the fraction of the export done.
+
+    Returns:
+        Byte content of the Excel file.
+    """
+    highlight_mode = highlight_mode or EXPORT_CONFIG["highlight_mode"]
+    if highlight_mode not in ("fill", "conditional"):
+        raise ValueError(f"Unknown highlight mode: {highlight_mode!r}")
+    engine = engine or EXPORT_CONFIG["engine"]
+    if engine not in ("xml", "openpyxl"):
+        raise ValueError(f"Unknown export engine: {engine!r}")
+
+    with stage("export", engine=engine, highlight_mode=highlight_mode) as record:
+        report = _export(data, results_df, highlight_mode, engine, on_progress)
+        record["rows"] = len(results_df)
+        record["bytes"] = len(report)
+    return report
+
+
+def _export(
+    data: bytes,
+    results_df: pd.DataFrame,
+    highlight_mode: str,
+    engine: str,
+    on_progress: Optional[Callable[[float], None]],
+) -> bytes:
+    """Body of `build_excel_report`, with validated settings."""
+    if engine == "xml" and highlight_mode == "fill":
+        colors = EXPORT_CONFIG["highlight_colors"]
+        try:
+            return xlsx_patch.highlight_rows(
+                data,
+                UPLOAD_CONFIG["sheet_name"],
+                {
+                    row: colors[change_type]
+                    for row, change_type in _highlighted_rows(results_df).items()
+                },
+                start_row=UPLOAD_CONFIG["skip_rows"][0] + 2,
+                on_progress=on_progress,
+            )
+        except xlsx_patch.UnsupportedWorkbook:
+            pass
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(data))
+    if on_progress:
+        on_progress(0.5)
+
+    # Get the PTA sheet
+    if UPLOAD_CONFIG["sheet_name"] in wb.sheetnames:
+        ws = wb[UPLOAD_CONFIG["sheet_name"]]
+        max_col = ws.max_column
+
+        # Find data start row (after skipping header rows)
+        start_row = UPLOAD_CONFIG["skip_rows"][0] + 2  # Skip header + extra row
+
+        # Data rows end at the first empty cell of the first column
+        end_row = start_row
+        for (first_cell,) in ws.iter_rows(min_row=start_row, max_col=1):
+            if first_cell.value is None:
+                break
+            end_row = first_cell.row + 1
+
+        # Excel row number (Cell ID) → change type of the rows to highlight
+        row_changes = {
+            row: change_type
+            for row, change_type in _highlighted_rows(results_df).items()
+            if start_row <= row < end_row
+        }
+
+        if highlight_mode == "conditional":
+            _add_conditional_highlight(
+                ws, row_changes, start_row, end_row - 1, max_col
+            )
+        else:
+            for row_idx, change_type in row_changes.items():
+                fill = _highlight_fills()[change_type]
+                row = next(ws.iter_rows(min_row=row_idx, max_row=row_idx, max_col=max_col))
+                for cell in row:
+                    cell.fill = fill
+    if on_progress:
+        on_progress(0.75)
+
+    # Save the workbook to the BytesIO object
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+#__TODO: Write a report file_______________________________________________
+def write_report(results_df: pd.DataFrame, new_data: bytes, output: Path, fmt: str) -> None:
+    """
+    Write the comparison report.
+
+    Args:
+        results_df: Comparison result.
+        new_data: Raw bytes of the new PTA file (base of the xlsx report).
+        output: Destination path.
+        fmt: "xlsx" (highlighted copy of the new file), "csv" or "parquet" (result table).
+    """
+    if fmt == "xlsx":
+        output.write_bytes(build_excel_report(new_data, results_df))
+    elif fmt == "csv":
+        results_df.to_csv(output, index=False)
+    elif fmt == "parquet":
+        results_df.to_parquet(output, index=False)
+    else:
+        raise ValueError(f"Unknown report format: {fmt!r}")
+
+
+def _highlighted_rows(results_df: pd.DataFrame) -> Dict[int, str]:
+    """Map the Cell ID of every New / Spring Changed row to its change type."""
+    highlighted = results_df[results_df['Change Type'].isin(EXPORT_CONFIG["highlight_colors"])]
+    return {
+        int(cell_id): str(change_type)
+        for cell_id, change_type in zip(highlighted['Cell ID New'], highlighted['Change Type'])
+    }
+
+def _add_conditional_highlight(
+    ws: Any, row_changes: Dict[int, str], start_row: int, last_row: int, max_col: int
+) -> None:
+    """
+    Write the change types into a hidden helper column and color the rows
+    with one conditional formatting rule per change type.
+
+    Args:
+        ws: PTA worksheet.
+        row_changes: Excel row number → change type of the rows to highlight.
+        start_row: First data row.
+        last_row: Last data row.
+        max_col: Last column of the PTA table.
+    """
+    if last_row < start_row:
+        return
+    from openpyxl.styles import PatternFill
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.utils import get_column_letter
+
+    helper_col = max_col + 1
+    helper = get_column_letter(helper_col)
+
+    ws.cell(row=FileHandler._header_row(), column=helper_col, value="Change Type")
+    for row_idx, change_type in row_changes.items():
+        ws.cell(row=row_idx, column=helper_col, value=change_type)
+    ws.column_dimensions[helper].hidden = True
+
+    cell_range = f"A{start_row}:{get_column_letter(max_col)}{last_row}"
+    for change_type, color in EXPORT_CONFIG["highlight_colors"].items():
+        ws.conditional_formatting.add(cell_range, FormulaRule(
+            formula=[f'${helper}{start_row}="{change_type}"'],
+            # differential (conditional) fills take their solid color from bgColor
+            fill=PatternFill('solid', start_color=color, end_color=color),
+        ))
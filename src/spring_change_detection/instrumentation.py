@@ -0,0 +1,209 @@
+"""
+Per-stage instrumentation of the pipeline.
+
+Every stage (parse, validate, clean, sequence, merge, classify, export,
+sheet and image extraction) runs inside `stage`, which measures its wall
+time, the rows and columns it produced and, when tracemalloc is tracing,
+its peak memory. Each record is written as one JSON line on the
+`spring_change_detection.stages` logger and appended to the recorder of the
+current context, if any:
+
+    with recording(session="abc") as records:
+        generate_results_df(old_df, new_df)
+    # records: [{"stage": "clean", "seconds": 0.01, "rows": 1000, ...}, ...]
+
+The recorder is held in a context variable, so every session (thread) of
+the server collects its own records. The library does not configure the
+logger: applications write the lines with `log_stages` (the app does, the
+command line tools with --log-stages or SPRING_STAGE_LOG).
+"""
+#__TODO: import libraries_______________________________________________
+import json
+import time
+import logging
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, MutableSequence, Optional
+
+from spring_change_detection.config import INSTRUMENTATION_CONFIG
+
+logger = logging.getLogger("spring_change_detection.stages")
+logger.addHandler(logging.NullHandler())
+
+_RECORDS: ContextVar[Optional[MutableSequence[Dict[str, Any]]]] = ContextVar(
+    "stage_records", default=None
+)
+_CONTEXT: ContextVar[Dict[str, Any]] = ContextVar("stage_context", default={})
+# peak memory of the enclosing stages, for nested stages (see `stage`)
+_OPEN_STAGES: ContextVar[tuple] = ContextVar("open_stages", default=())
+# destinations given to `log_stages`, and the handlers writing to them
+_STAGE_LOG: Dict[str, Any] = {"stderr": False, "path": None}
+_STAGE_HANDLERS: List[logging.Handler] = []
+
+
+#__TODO: Record the stages_______________________________________________
+@contextmanager
+def recording(
+    records: Optional[MutableSequence[Dict[str, Any]]] = None, **context: Any
+) -> Iterator[MutableSequence[Dict[str, Any]]]:
+    """
+    Collect the records of the stages run in this context.
+
+    Args:
+        records: List (or bounded deque) receiving the records (default: a new list).
+        **context: Fields added to every record and log line (e.g. session id).
+
+    Yields:
+        The sequence receiving the records.
+    """
+    records = [] if records is None else records
+    records_token = _RECORDS.set(records)
+    context_token = _CONTEXT.set({**_CONTEXT.get(), **context})
+    try:
+        yield records
+    finally:
+        _RECORDS.reset(records_token)
+        _CONTEXT.reset(context_token)
+
+
+@contextmanager
+def stage(name: str, **fields: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Measure one pipeline stage.
+
+    The caller fills in the size of what the stage produced:
+
+        with stage("clean") as record:
+            df = clean_dataframe(df)
+            record["rows"], record["columns"] = df.shape
+
+    Peak memory is the highest traced allocation above the memory in use
+    when the stage started (nested stages included). tracemalloc traces the
+    whole process, so concurrent sessions inflate each other's peaks.
+
+    Args:
+        name: Stage name.
+        **fields: Extra fields of the record (e.g. file label, sheet name).
+
+    Yields:
+        The record of the stage.
+    """
+    record: Dict[str, Any] = {"stage": name, "seconds": None, "rows": None,
+                              "columns": None, "peak_mb": None, **fields}
+    if not INSTRUMENTATION_CONFIG["enabled"]:
+        yield record
+        return
+
+    tracing = tracemalloc.is_tracing()
+    peaks = {"base": 0, "peak": 0}
+    open_stages = _OPEN_STAGES.get()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if open_stages:
+            open_stages[-1]["peak"] = max(open_stages[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        peaks.update(base=current, peak=current)
+    token = _OPEN_STAGES.set(open_stages + (peaks,))
+
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        _OPEN_STAGES.reset(token)
+        if tracing and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], peaks["peak"])
+            record["peak_mb"] = round((peak - peaks["base"]) / 2 ** 20, 3)
+            tracemalloc.reset_peak()
+            if open_stages:
+                open_stages[-1]["peak"] = max(open_stages[-1]["peak"], peak)
+        _emit(record)
+
+
+def _emit(record: Dict[str, Any]) -> None:
+    """Append a finished record to the current recorder and log it as JSON."""
+    record.update({key: value for key, value in _CONTEXT.get().items() if key not in record})
+    records = _RECORDS.get()
+    if records is not None:
+        records.append(record)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": "stage", "time": round(time.time(), 3), **record},
+                               default=str, ensure_ascii=False))
+
+
+def log_stages(stderr: bool = False, path: Optional[str] = None) -> None:
+    """
+    Write the JSON lines of the stages at INFO to stderr and/or a file,
+    whatever the logging setup of the application. The lines then no longer
+    propagate to the root logger, which would write them twice.
+
+    Calling it again replaces the destinations of the previous call; without
+    any, the logger is left to the application's setup again.
+
+    Args:
+        stderr: Write the lines to stderr.
+        path: File the lines are appended to (e.g. INSTRUMENTATION_CONFIG["log_path"]).
+    """
+    if _STAGE_LOG == {"stderr": stderr, "path": path}:
+        return  # the app calls it on every rerun
+    for handler in _STAGE_HANDLERS:
+        logger.removeHandler(handler)
+        handler.close()
+    _STAGE_HANDLERS.clear()
+    _STAGE_LOG.update(stderr=stderr, path=path)
+
+    if stderr:
+        _STAGE_HANDLERS.append(logging.StreamHandler())
+    if path:
+        _STAGE_HANDLERS.append(logging.FileHandler(path, encoding="utf-8"))
+    for handler in _STAGE_HANDLERS:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO if _STAGE_HANDLERS else logging.NOTSET)
+    logger.propagate = not _STAGE_HANDLERS
+
+
+def stage_log_settings() -> Dict[str, Any]:
+    """Destinations of the last `log_stages` call, to pass on to worker processes."""
+    return dict(_STAGE_LOG)
+
+
+#__TODO: Memory tracing_______________________________________________
+def set_memory_tracing(enabled: bool) -> None:
+    """
+    Start or stop measuring the peak memory of the stages (tracemalloc).
+
+    Tracing slows allocations down and applies to the whole process.
+    """
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def summarize_stages(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate stage records by stage name.
+
+    Returns:
+        {stage: {"count", "seconds" (total), "max_seconds", "max_peak_mb"}}.
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        entry = summary.setdefault(record["stage"], {
+            "count": 0, "seconds": 0.0, "max_seconds": 0.0, "max_peak_mb": None
+        })
+        entry["count"] += 1
+        entry["seconds"] += record["seconds"] or 0.0
+        entry["max_seconds"] = max(entry["max_seconds"], record["seconds"] or 0.0)
+        if record.get("peak_mb") is not None:
+            entry["max_peak_mb"] = max(entry["max_peak_mb"] or 0.0, record["peak_mb"])
+    return summary
+
+
+if INSTRUMENTATION_CONFIG["trace_memory"]:
+    set_memory_tracing(True)
@@ -0,0 +1,466 @@
+"""
+Validation and parsing of the PTA Excel files.
+
+Parsed sheets are cached per content hash for the whole server process and
+PTA sheets are also kept in the persistent store (see `store`), shared by
+every process. openpyxl is imported on first use so that importing this module stays cheap.
+"""
+#__TODO: import libraries_______________________________________________
+import io
+import sys
+import zipfile
+import threading
+from typing import Any, Dict, Iterable, List, Tuple, Optional
+import pandas as pd
+from spring_change_detection.config import (
+    UPLOAD_CONFIG, REQUIRED_COLUMNS, CACHE_CONFIG,
+    COLUMN_DTYPES, VP_COLUMNS_KEY, VU_COLUMNS_KEY
+)
+from spring_change_detection.cache import LRUCache, content_hash
+from spring_change_detection import store
+from spring_change_detection.instrumentation import stage
+
+# parsed workbooks and PTA sheets shared by every session of the server process
+_PARSE_CACHE = LRUCache(CACHE_CONFIG["parse_cache_max_bytes"])
+
+
+class _OpenWorkbook:
+    """
+    A workbook opened once in read-only mode, kept open for its sheets and images.
+
+    Opening parses the workbook part, the styles and the shared strings
+    (shared with the large PTA sheet); every sheet table and drawing is then
+    read from this one open archive. openpyxl's archive is not thread-safe,
+    so every read holds `lock`.
+    """
+
+    def __init__(self, data: bytes):
+        from openpyxl import load_workbook
+
+        # the settings pandas opens workbooks with, for the same values
+        self.book = load_workbook(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+        self.excel_file = pd.ExcelFile(self.book, engine="openpyxl")
+        self.archive = self.book._archive
+        self.parts = FileHandler._sheet_parts(self.archive)
+        self.lock = threading.Lock()
+        self._nbytes = len(data) + sum(sys.getsizeof(s) for s in self.book.shared_strings)
+
+    def __sizeof__(self) -> int:
+        # the cache budget counts the archive and the parsed shared strings
+        return self._nbytes
+
+class FileHandler:
+    """Handles validation and parsing of Excel files."""
+
+    #__TODO: Validate the uploaded excel buffer_______________________________________________
+    @staticmethod
+    def validate_excel_file(
+        file: Any, file_label: str, pta_type: str = "VP"
+    ) -> Tuple[bool, str, Optional[pd.DataFrame]]:
+        """
+        Only the columns used by the comparison are loaded, with the typed
+        schema of `pta_type`. Use `read_display_sheet` for the full sheet.
+
+        Args:
+            file: Uploaded file.
+            file_label: A label for the file (e.g., "old", "new").
+            pta_type: Either "VP" or "VU" to select the key columns to load.
+
+        Returns:
+            Tuple containing:
+              - validity (bool)
+              - message (str)
+              - DataFrame if valid, else None
+        """
+        with stage("validate", file=file_label, pta_type=pta_type) as record:
+            is_valid, msg, df = FileHandler._validate(file, file_label, pta_type)
+            record["valid"] = is_valid
+            if df is not None:
+                record["rows"], record["columns"] = df.shape
+        return is_valid, msg, df
+
+    @staticmethod
+    def _validate(
+        file: Any, file_label: str, pta_type: str
+    ) -> Tuple[bool, str, Optional[pd.DataFrame]]:
+        """Body of `validate_excel_file`."""
+        if not file:
+            return False, f"No '{file_label}' file uploaded.", None
+
+        data = FileHandler._get_bytes(file)
+
+        # pre-flight: reject oversized files and wrong headers before the full parse
+        is_valid, msg = FileHandler._validate_size(data, file_label)
+        if not is_valid:
+            return False, msg, None
+
+        digest = content_hash(data)
+        schema = FileHandler.ingestion_schema(pta_type)
+        df = FileHandler._load_pta_sheet(digest, schema)
+        if df is None:
+            try:
+                header = FileHandler._read_header(data, digest)
+            except Exception as e:
+                return False, f"Error reading '{file_label}' file: {e}", None
+
+            is_valid, msg = FileHandler._validate_columns(header)
+            if not is_valid:
+                return False, msg, None
+
+            try:
+                df = FileHandler._read_pta_sheet(data, digest, schema)
+            except Exception as e:
+                return False, f"Error reading '{file_label}' file: {e}", None
+
+        if df.empty:
+            return False, f"'{file_label}' file is empty.", None
+
+        is_valid, msg = FileHandler._validate_columns(df.columns)
+        if not is_valid:
+            return False, msg, None
+
+        return True, "File uploaded successfully.", df
+    
+    #__TODO: Read the PTA sheet (cached by content)_______________________________________
+    @staticmethod
+    def ingestion_schema(pta_type: str = "VP") -> Dict[str, Any]:
+        """
+        Columns compared for a PTA type, mapped to the dtype they are read with.
+
+        Args:
+            pta_type: Either "VP" or "VU" to select appropriate key columns.
+
+        Returns:
+            Mapping of column name to dtype.
+        """
+        keys = VP_COLUMNS_KEY if pta_type == "VP" else VU_COLUMNS_KEY
+        schema = {key: COLUMN_DTYPES["key"] for key in keys}
+        schema[REQUIRED_COLUMNS["reference"]] = COLUMN_DTYPES["reference"]
+        schema[REQUIRED_COLUMNS["mass"]] = COLUMN_DTYPES["mass"]
+        return schema
+
+    @staticmethod
+    def read_display_sheet(file: Any) -> pd.DataFrame:
+        """
+        Load every column of the PTA sheet (with inferred dtypes) for display or export.
+
+        Args:
+            file: Uploaded file.
+
+        Returns:
+            The full PTA sheet as a DataFrame.
+        """
+        data = FileHandler._get_bytes(file)
+        return FileHandler._read_pta_sheet(data, content_hash(data))
+
+    #__TODO: Read the other sheets on demand (cached by content)_______________________
+    @staticmethod
+    def read_workbook(file: Any) -> Dict[str, Any]:
+        """
+        Index the sheets of a workbook without parsing their cells.
+
+        Only the workbook part, the shared strings and the sheet relationships
+        are read; sheet tables and images are then loaded one sheet at a time
+        with `read_sheet` and `read_sheet_images`, from the same open workbook
+        (see `_open_workbook`). Cached per content hash.
+
+        Args:
+            file: Uploaded file.
+
+        Returns:
+            Dict with:
+              - "sheet_names": sheet names in workbook order
+              - "drawing_sheets": names of the sheets that have a drawing (images or charts)
+        """
+        data = FileHandler._get_bytes(file)
+        key = (content_hash(data), "workbook")
+        index = _PARSE_CACHE.get(key)
+        if index is None:
+            workbook = FileHandler._open_workbook(data, key[0])
+            with workbook.lock:
+                index = {
+                    "sheet_names": list(workbook.parts),
+                    "drawing_sheets": [
+                        name for name, path in workbook.parts.items()
+                        if FileHandler._drawing_parts(workbook.archive, path)
+                    ],
+                }
+            _PARSE_CACHE.put(key, index)
+        return index
+
+    @staticmethod
+    def read_sheet(file: Any, sheet_name: str) -> pd.DataFrame:
+        """
+        Load one sheet of a workbook, reusing a previous parse of identical bytes.
+
+        Only the requested sheet's cells are parsed. The PTA sheet is read
+        without its skipped rows, like `read_display_sheet`. The returned
+        DataFrame is shared between callers and must not be modified in place.
+
+        Args:
+            file: Uploaded file.
+            sheet_name: Name of the sheet to load.
+
+        Returns:
+            The sheet as a DataFrame.
+        """
+        if sheet_name == UPLOAD_CONFIG["sheet_name"]:
+            return FileHandler.read_display_sheet(file)
+        data = FileHandler._get_bytes(file)
+        key = (content_hash(data), "sheet", sheet_name)
+        df = _PARSE_CACHE.get(key)
+        if df is None:
+            workbook = FileHandler._open_workbook(data, key[0])
+            with stage("sheet_extraction", sheet=sheet_name) as record, workbook.lock:
+                df = workbook.excel_file.parse(sheet_name)
+                record["rows"], record["columns"] = df.shape
+            _PARSE_CACHE.put(key, df)
+        return df
+
+    @staticmethod
+    def read_sheet_images(file: Any, sheet_name: str) -> List[Dict[str, Any]]:
+        """
+        Extract the images embedded in one sheet of a workbook (cached by content).
+
+        Args:
+            file: Uploaded file.
+            sheet_name: Name of the sheet.
+
+        Returns:
+            List of {"data": bytes, "width": int, "height": int}, in drawing order.
+        """
+        data = FileHandler._get_bytes(file)
+        key = (content_hash(data), "images", sheet_name)
+        images = _PARSE_CACHE.get(key)
+        if images is None:
+            from openpyxl.reader.drawings import find_images
+
+            images = []
+            workbook = FileHandler._open_workbook(data, key[0])
+            with stage("image_extraction", sheet=sheet_name) as record, workbook.lock:
+                archive = workbook.archive
+                path = workbook.parts.get(sheet_name)
+                for drawing in FileHandler._drawing_parts(archive, path) if path else []:
+                    for image in find_images(archive, drawing)[1]:
+                        img_data = image._data()
+                        if img_data:
+                            images.append({
+                                "data": img_data, "width": image.width, "height": image.height
+                            })
+                record["rows"] = len(images)
+            _PARSE_CACHE.put(key, images)
+        return images
+
+    @staticmethod
+    def _open_workbook(data: bytes, digest: str) -> _OpenWorkbook:
+        """
+        The read-only workbook of `data`, opened once per content hash.
+
+        Args:
+            data: Raw bytes of the Excel file.
+            digest: Content hash of `data`.
+
+        Returns:
+            The open workbook, shared between callers (read it under its lock).
+        """
+        key = (digest, "open_workbook")
+        workbook = _PARSE_CACHE.get(key)
+        if workbook is None:
+            workbook = _OpenWorkbook(data)
+            _PARSE_CACHE.put(key, workbook)
+        return workbook
+
+    @staticmethod
+    def _sheet_parts(archive: zipfile.ZipFile) -> Dict[str, str]:
+        """Sheet name → zip path of the sheet part, in workbook order."""
+        from openpyxl.reader.workbook import WorkbookParser
+        from openpyxl.xml.constants import ARC_WORKBOOK
+
+        parser = WorkbookParser(archive, ARC_WORKBOOK)
+        parser.parse()
+        return {sheet.name: rel.target for sheet, rel in parser.find_sheets()}
+
+    @staticmethod
+    def _drawing_parts(archive: zipfile.ZipFile, sheet_path: str) -> List[str]:
+        """Zip paths of the drawings attached to a sheet part."""
+        from openpyxl.packaging.relationship import get_dependents, get_rels_path
+        from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+
+        rels_path = get_rels_path(sheet_path)
+        if rels_path not in archive.namelist():
+            return []
+        rels = get_dependents(archive, rels_path)
+        return [rel.target for rel in rels.find(SpreadsheetDrawing._rel_type)]
+
+    @staticmethod
+    def file_hash(file: Any) -> str:
+        """Return the content hash of an uploaded file or binary buffer."""
+        return content_hash(FileHandler._get_bytes(file))
+
+    @staticmethod
+    def _get_bytes(file: Any) -> bytes:
+        """Return the raw bytes of an uploaded file or binary buffer."""
+        if isinstance(file, (bytes, bytearray)):
+            return bytes(file)
+        if hasattr(file, "getvalue"):
+            return file.getvalue()
+        file.seek(0)
+        return file.read()
+
+    @staticmethod
+    def _header_row() -> int:
+        """Excel row number (1-based) of the PTA header, i.e. the first row not skipped."""
+        row = 0
+        while row in UPLOAD_CONFIG["skip_rows"]:
+            row += 1
+        return row + 1
+
+    @staticmethod
+    def _read_header(data: bytes, digest: str) -> Tuple[Any, ...]:
+        """
+        Read only the header row of the PTA sheet in read-only streaming mode.
+
+        Args:
+            data: Raw bytes of the Excel file.
+            digest: Content hash of `data`.
+
+        Returns:
+            The header cell values.
+        """
+        key = (digest, UPLOAD_CONFIG["sheet_name"], "header")
+        header = _PARSE_CACHE.get(key)
+        if header is None:
+            from openpyxl import load_workbook
+
+            wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+            try:
+                if UPLOAD_CONFIG["sheet_name"] not in wb.sheetnames:
+                    raise ValueError(f"Worksheet named '{UPLOAD_CONFIG['sheet_name']}' not found")
+                ws = wb[UPLOAD_CONFIG["sheet_name"]]
+                # iter_rows is bounded by the stored <dimension>, which can be stale
+                ws.reset_dimensions()
+                row = FileHandler._header_row()
+                header = next(ws.iter_rows(min_row=row, max_row=row, values_only=True), ())
+            finally:
+                wb.close()
+            _PARSE_CACHE.put(key, header)
+        return header
+
+    @staticmethod
+    def _pta_sheet_key(digest: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[Any, ...]:
+        """Cache and store key of the PTA sheet of `digest` read with `schema`."""
+        return (
+            digest,
+            UPLOAD_CONFIG["sheet_name"],
+            tuple(UPLOAD_CONFIG["skip_rows"]),
+            tuple(schema.items()) if schema else None,
+        )
+
+    @staticmethod
+    def _load_pta_sheet(
+        digest: str, schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Get an already parsed PTA sheet without opening the workbook.
+
+        The memory cache is tried first, then the persistent store, whose
+        frames were validated when they were written.
+
+        Args:
+            digest: Content hash of the Excel file.
+            schema: Columns loaded with their dtypes; None for every column.
+
+        Returns:
+            The PTA sheet as a DataFrame, or None when it was never parsed.
+        """
+        key = FileHandler._pta_sheet_key(digest, schema)
+        df = _PARSE_CACHE.get(key)
+        if df is None and store.contains(key):
+            with stage("parse", source="store") as record:
+                df = store.load(key)
+                if df is not None:
+                    record["rows"], record["columns"] = df.shape
+            if df is not None:
+                _PARSE_CACHE.put(key, df)
+        return df
+
+    @staticmethod
+    def _read_pta_sheet(
+        data: bytes, digest: str, schema: Optional[Dict[str, Any]] = None
+    ) -> pd.DataFrame:
+        """
+        Parse the PTA sheet of a workbook, reusing a previous parse of identical bytes.
+
+        The cache key is the content hash plus the sheet name, skipped rows and
+        schema, so an unchanged upload is parsed only once per server process,
+        and a sheet with the required columns is parsed only once per store.
+        The returned DataFrame is shared between callers and must not be modified in place.
+
+        Args:
+            data: Raw bytes of the Excel file.
+            digest: Content hash of `data`.
+            schema: Columns to load with their dtypes; None loads every column.
+
+        Returns:
+            The PTA sheet as a DataFrame.
+        """
+        df = FileHandler._load_pta_sheet(digest, schema)
+        if df is None:
+            with stage("parse", source="excel") as record:
+                df = (
+                    pd.read_excel(
+                        io.BytesIO(data),
+                        engine="openpyxl",
+                        sheet_name=UPLOAD_CONFIG["sheet_name"],
+                        skiprows=UPLOAD_CONFIG["skip_rows"],
+                        usecols=(lambda col: col in schema) if schema else None,
+                        dtype=schema,
+                    )
+                    .reset_index(drop=True)
+                )
+                record["rows"], record["columns"] = df.shape
+            key = FileHandler._pta_sheet_key(digest, schema)
+            # only validated sheets are kept, so a store hit skips the checks
+            if not df.empty and FileHandler._validate_columns(df.columns)[0]:
+                store.save(key, df)
+            _PARSE_CACHE.put(key, df)
+        return df
+
+    #__TODO: Validate the crucial columns_______________________________________________
+    @staticmethod
+    def _validate_size(data: bytes, file_label: str) -> Tuple[bool, str]:
+        """
+        Check the file against the declared upload size limit (in MB).
+
+        Args:
+            data: Raw bytes of the Excel file.
+            file_label: A label for the file (e.g., "old", "new").
+
+        Returns:
+            validity and error message if invalid.
+        """
+        max_size = UPLOAD_CONFIG["max_file_size"]
+        if len(data) > max_size * 1024 * 1024:
+            return False, f"'{file_label}' file exceeds the {max_size} MB size limit."
+        return True, ""
+
+    @staticmethod
+    def _validate_columns(columns: Iterable[Any]) -> Tuple[bool, str]:
+        """
+        Check for required columns
+
+        Args:
+            columns: Column names (DataFrame columns or header row) to validate.
+
+        Returns:
+            validity and error message if invalid.
+        """
+        columns = set(columns)
+        required_cols = [
+            REQUIRED_COLUMNS["mass"],
+            REQUIRED_COLUMNS["reference"],
+        ]
+        missing = [col for col in required_cols if col not in columns]
+        if missing:
+            return False, f"Missing columns: {', '.join(missing)}."
+        return True, ""
@@ -0,0 +1,170 @@
+"""
+Persistent columnar store of parsed PTA sheets.
+
+A validated sheet is written once as an uncompressed Arrow IPC file named
+after the content hash of the workbook and the schema it was read with.
+Later loads, from any server process or batch worker sharing the store
+folder, read that file instead of parsing the workbook with openpyxl. What
+is shared is the parsing work, not memory: the file is memory-mapped, but
+its columns are converted to the numpy dtypes the comparison works with, so
+every process holds its own copy of the frame.
+
+Files are written to a temporary name and renamed into place, so a reader
+never sees a partial file, and the least recently used files are deleted
+when the store grows over its byte budget. The store is a cache: any error
+while reading or writing it falls back to parsing the workbook.
+"""
+#__TODO: import libraries_______________________________________________
+import os
+import tempfile
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+from typing import Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from spring_change_detection.config import STORE_CONFIG
+from spring_change_detection.cache import content_hash
+
+# bump when the layout of the stored frames changes, to ignore older files
+STORE_VERSION = 1
+
+_SUFFIX = ".arrow"
+
+
+@lru_cache(maxsize=1)
+def _library_versions() -> tuple:
+    """Versions of the libraries the stored frames depend on (reading, dtypes and file format)."""
+    return tuple(version(name) for name in ("openpyxl", "pandas", "pyarrow"))
+
+
+def _path(key: Hashable) -> Path:
+    """File of the store holding the frame of `key`."""
+    name = content_hash(repr((STORE_VERSION, _library_versions(), key)).encode())
+    return Path(STORE_CONFIG["directory"]) / f"{name}{_SUFFIX}"
+
+
+#__TODO: Read and write the stored frames_______________________________________________
+def contains(key: Hashable) -> bool:
+    """Whether the store is enabled and has a file for `key`."""
+    return STORE_CONFIG["enabled"] and _path(key).is_file()
+
+
+def load(key: Hashable) -> Optional[pd.DataFrame]:
+    """
+    Read the stored frame of `key`.
+
+    The file is memory-mapped and converted to pandas columns (categoricals,
+    object strings, float64), which copies them into the calling process.
+
+    Args:
+        key: Hashable key of the frame (content hash, sheet and schema).
+
+    Returns:
+        The stored DataFrame, or None when the store is disabled or has no
+        readable frame for `key`.
+    """
+    if not STORE_CONFIG["enabled"]:
+        return None
+    path = _path(key)
+    if not path.is_file():
+        return None
+    try:
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+        df = table.to_pandas()
+    except Exception:
+        # unreadable (e.g. written by another library version): parse again
+        _remove(path)
+        return None
+
+    # Arrow has a single null; restore the NaN of the parsed object columns
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    try:
+        os.utime(path)  # recency of the least-recently-used eviction
+    except OSError:
+        pass
+    return df
+
+
+def save(key: Hashable, df: pd.DataFrame) -> bool:
+    """
+    Write the frame of `key` to the store, atomically.
+
+    Frames Arrow cannot represent (e.g. a column mixing numbers and text)
+    are not stored.
+
+    Args:
+        key: Hashable key of the frame (content hash, sheet and schema).
+        df: Parsed frame with a default RangeIndex.
+
+    Returns:
+        True when the frame was stored.
+    """
+    if not STORE_CONFIG["enabled"]:
+        return False
+    path = _path(key)
+    tmp = None
+    try:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    except Exception:
+        if tmp is not None:
+            _remove(Path(tmp))
+        return False
+    prune()
+    return True
+
+
+#__TODO: Keep the store under its budget_______________________________________________
+def prune(max_bytes: Optional[int] = None) -> int:
+    """
+    Delete the least recently used files until the store fits its budget.
+
+    Args:
+        max_bytes: Byte budget of the store (default: STORE_CONFIG["max_bytes"]).
+
+    Returns:
+        Number of files deleted.
+    """
+    max_bytes = STORE_CONFIG["max_bytes"] if max_bytes is None else max_bytes
+    files = []
+    for path in Path(STORE_CONFIG["directory"]).glob(f"*{_SUFFIX}"):
+        try:
+            stat = path.stat()
+        except OSError:  # deleted by another process
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    deleted = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def clear() -> None:
+    """Delete every stored frame."""
+    prune(0)
+
+
+def _remove(path: Path) -> None:
+    """Delete a file, ignoring a concurrent deletion."""
+    try:
+        path.unlink()
+    except OSError:
+        pass
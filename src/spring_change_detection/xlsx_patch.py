@@ -0,0 +1,379 @@
+"""
+Streaming .xlsx patcher used by the Excel export.
+
+An .xlsx file is a zip of XML parts. To highlight rows of one worksheet we
+only need to touch two parts: `styles.xml` (new fills and cell formats) and
+the worksheet XML (the `s` style index of the cells of the highlighted rows).
+Every other part is copied unchanged, and the worksheet is rewritten chunk by
+chunk, so the workbook is never loaded into an object model.
+"""
+import io
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Optional, Tuple
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class UnsupportedWorkbook(ValueError):
+    """The workbook layout is not handled by the patcher."""
+
+
+#__TODO: Highlight rows of a worksheet__________________________________________
+def highlight_rows(
+    data: bytes,
+    sheet_name: str,
+    row_colors: Dict[int, str],
+    start_row: int,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> bytes:
+    """
+    Fill every cell of the given rows of a worksheet with a solid color.
+
+    Matches the openpyxl export: data rows start at `start_row` and end at the
+    first row whose first cell is empty, and each highlighted row is filled
+    from column A to the last used column of the sheet, keeping the fonts,
+    borders and number formats of the cells.
+
+    Args:
+        data: Raw bytes of the .xlsx file.
+        sheet_name: Name of the worksheet to patch.
+        row_colors: Excel row number → RGB hex color ("FF5733").
+        start_row: First data row.
+        on_progress: Optional callback receiving the fraction of the sheet processed.
+
+    Returns:
+        Byte content of the patched .xlsx file.
+
+    Raises:
+        UnsupportedWorkbook: If the file is not a zip-based workbook the patcher understands.
+    """
+    try:
+        zin = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile as e:
+        raise UnsupportedWorkbook(f"Not an .xlsx file: {e}") from e
+
+    with zin:
+        sheet_path, styles_path = _locate_parts(zin, sheet_name)
+        styles = _Styles(zin.read(styles_path))
+        output = io.BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                if info.filename == styles_path:
+                    continue  # written last, once the sheet has registered its formats
+                if info.filename == sheet_path:
+                    with zin.open(info) as src, zout.open(_new_info(info), "w", force_zip64=True) as dst:
+                        _SheetPatcher(styles, row_colors, start_row, info.file_size, on_progress).run(
+                            src, dst, _read_max_column(zin, info)
+                        )
+                else:
+                    _copy_entry(zin, zout, info)
+            zout.writestr(_new_info(zin.getinfo(styles_path)), styles.to_bytes())
+    return output.getvalue()
+
+
+def _locate_parts(zin: zipfile.ZipFile, sheet_name: str) -> Tuple[str, str]:
+    """Resolve the zip paths of a worksheet and of the styles part from the workbook relationships."""
+    try:
+        workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+        rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    except KeyError as e:
+        raise UnsupportedWorkbook(f"Missing workbook part: {e}") from e
+
+    targets, styles_path = {}, None
+    for rel in rels.iter(f"{{{_NS_PKG_REL}}}Relationship"):
+        target = rel.get("Target", "")
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+        targets[rel.get("Id")] = path
+        if rel.get("Type", "").endswith("/styles"):
+            styles_path = path
+
+    sheet_path = None
+    for sheet in workbook.iter(f"{{{_NS_MAIN}}}sheet"):
+        if sheet.get("name") == sheet_name:
+            sheet_path = targets.get(sheet.get(f"{{{_NS_REL}}}id"))
+    if sheet_path is None or sheet_path not in zin.namelist():
+        raise UnsupportedWorkbook(f"Worksheet '{sheet_name}' not found")
+    if styles_path is None or styles_path not in zin.namelist():
+        raise UnsupportedWorkbook("Workbook has no styles part")
+    return sheet_path, styles_path
+
+
+def _new_info(info: zipfile.ZipInfo, compress_type: int = zipfile.ZIP_DEFLATED) -> zipfile.ZipInfo:
+    """Copy the name, timestamp and attributes of an entry for the output zip."""
+    new = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    new.compress_type = compress_type
+    new.external_attr = info.external_attr
+    return new
+
+
+def _copy_entry(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """Copy an untouched part with its original content and compression."""
+    with zin.open(info) as src, zout.open(_new_info(info, info.compress_type), "w", force_zip64=True) as dst:
+        while True:
+            chunk = src.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+
+
+#__TODO: Cell references________________________________________________________
+_CELL_REF = re.compile(rb"([A-Z]+)(\d+)")
+
+
+def _column_index(letters: bytes) -> int:
+    """Convert column letters (b"AB") to a 1-based index."""
+    index = 0
+    for char in letters:
+        index = index * 26 + (char - 64)
+    return index
+
+
+def _column_letters(index: int) -> bytes:
+    """Convert a 1-based column index to its letters."""
+    letters = b""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = bytes([65 + rem]) + letters
+    return letters
+
+
+def _read_max_column(zin: zipfile.ZipFile, info: zipfile.ZipInfo) -> int:
+    """
+    Last used column of a worksheet, from its `<dimension>` element when it
+    agrees with the last cell of the first row or, when it is absent or stale
+    (writers do not always update it), from a scan of every cell reference.
+    """
+    with zin.open(info) as src:
+        head = src.read(64 * 1024)
+    match = re.search(rb'<(?:\w+:)?dimension\s+ref="([^"]+)"', head)
+    first_row = re.search(rb"<(?:\w+:)?row\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?row>)", head, re.DOTALL)
+    if match and first_row:
+        ref = _CELL_REF.match(match.group(1).split(b":")[-1])
+        header = re.findall(rb'\br="([A-Z]+)\d+"', first_row.group(1) or b"")
+        if ref and header and _column_index(ref.group(1)) == max(map(_column_index, header)):
+            return _column_index(ref.group(1))
+
+    # only cell references contain letters (row references are plain numbers)
+    columns, tail = set(), b""
+    with zin.open(info) as src:
+        while True:
+            chunk = src.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            text = tail + chunk
+            columns.update(re.findall(rb'\br="([A-Z]+)\d+"', text))
+            tail = text[-256:]
+    return max(map(_column_index, columns), default=0)
+
+
+#__TODO: styles.xml_____________________________________________________________
+class _Styles:
+    """
+    Text-level editor of styles.xml: adds solid fills and cell formats
+    (clones of existing ones with the fill replaced) without re-serializing
+    the rest of the part.
+    """
+
+    _XF = re.compile(rb"<(?:\w+:)?xf\b[^>]*?(?:/>|>.*?</(?:\w+:)?xf>)", re.DOTALL)
+
+    def __init__(self, xml: bytes):
+        self.xml = xml
+        prefix = re.search(rb"<(\w+:)?styleSheet\b", xml)
+        if prefix is None:
+            raise UnsupportedWorkbook("Unexpected styles part")
+        self.prefix = prefix.group(1) or b""
+        self.fill_count = self._count(b"fills")
+        self.cell_xfs = self._cell_xfs()
+        self.new_fills: List[str] = []
+        self.new_xfs: List[bytes] = []
+        self._fill_ids: Dict[str, int] = {}
+        self._clones: Dict[Tuple[int, str], int] = {}
+
+    def _section(self, tag: bytes) -> Optional[re.Match]:
+        p = re.escape(self.prefix)
+        return re.search(
+            rb"<" + p + tag + rb"\b([^>]*?)(?:/>|>(.*?)</" + p + tag + rb">)", self.xml, re.DOTALL
+        )
+
+    def _count(self, tag: bytes) -> int:
+        section = self._section(tag)
+        if section is None:
+            return 0
+        return len(re.findall(rb"<" + re.escape(self.prefix) + tag[:-1] + rb"\b", section.group(2) or b""))
+
+    def _cell_xfs(self) -> List[bytes]:
+        section = self._section(b"cellXfs")
+        if section is None:
+            raise UnsupportedWorkbook("styles.xml has no cellXfs")
+        return self._XF.findall(section.group(2) or b"")
+
+    def fill_id(self, color: str) -> int:
+        """Index of the solid fill of `color`, added on first use."""
+        if color not in self._fill_ids:
+            self._fill_ids[color] = self.fill_count + len(self.new_fills)
+            self.new_fills.append(color)
+        return self._fill_ids[color]
+
+    def with_fill(self, xf_index: int, color: str) -> int:
+        """Index of a cell format equal to `xf_index` with the solid fill of `color`."""
+        key = (xf_index, color)
+        if key not in self._clones:
+            base = self.cell_xfs[xf_index] if xf_index < len(self.cell_xfs) else self.cell_xfs[0]
+            xf = _set_attr(base, b"fillId", str(self.fill_id(color)).encode())
+            xf = _set_attr(xf, b"applyFill", b"1")
+            self._clones[key] = len(self.cell_xfs) + len(self.new_xfs)
+            self.new_xfs.append(xf)
+        return self._clones[key]
+
+    def to_bytes(self) -> bytes:
+        """styles.xml with the new fills and cell formats appended."""
+        p = self.prefix
+        xml = self.xml
+        if self.new_fills:
+            fills = b"".join(
+                b"<%sfill><%spatternFill patternType=\"solid\"><%sfgColor rgb=\"FF%s\"/>"
+                b"<%sbgColor indexed=\"64\"/></%spatternFill></%sfill>"
+                % (p, p, p, color.encode(), p, p, p)
+                for color in self.new_fills
+            )
+            xml = self._append(xml, b"fills", fills, self.fill_count + len(self.new_fills))
+        if self.new_xfs:
+            xml = self._append(xml, b"cellXfs", b"".join(self.new_xfs), len(self.cell_xfs) + len(self.new_xfs))
+        return xml
+
+    def _append(self, xml: bytes, tag: bytes, children: bytes, count: int) -> bytes:
+        p = re.escape(self.prefix)
+        section = re.search(
+            rb"<" + p + tag + rb"\b([^>]*?)(/>|>(.*?)</" + p + tag + rb">)", xml, re.DOTALL
+        )
+        if section is None:
+            # no <fills> section: insert one as the first child of the style sheet
+            root = re.search(rb"<" + p + rb"styleSheet\b[^>]*>", xml)
+            element = b"<%s%s count=\"%d\">%s</%s%s>" % (self.prefix, tag, count, children, self.prefix, tag)
+            return xml[:root.end()] + element + xml[root.end():]
+        attrs = _set_attr(b"<" + self.prefix + tag + section.group(1) + b">", b"count", str(count).encode())
+        body = section.group(3) or b""
+        element = attrs + body + children + b"</" + self.prefix + tag + b">"
+        return xml[:section.start()] + element + xml[section.end():]
+
+
+def _set_attr(tag: bytes, name: bytes, value: bytes) -> bytes:
+    """Set an attribute on the start tag at the beginning of `tag`."""
+    end = tag.index(b">")
+    if tag[end - 1:end] == b"/":
+        end -= 1
+    start_tag = tag[:end]
+    pattern = re.compile(rb"(\s" + name + rb'=")[^"]*(")')
+    if pattern.search(start_tag):
+        start_tag = pattern.sub(lambda m: m.group(1) + value + m.group(2), start_tag, count=1)
+    else:
+        start_tag += b" " + name + b'="' + value + b'"'
+    return start_tag + tag[end:]
+
+
+#__TODO: worksheet XML__________________________________________________________
+class _SheetPatcher:
+    """Rewrites the `<row>` elements of a worksheet stream, leaving everything else untouched."""
+
+    def __init__(
+        self,
+        styles: _Styles,
+        row_colors: Dict[int, str],
+        start_row: int,
+        total_size: int,
+        on_progress: Optional[Callable[[float], None]] = None,
+    ):
+        self.styles = styles
+        self.row_colors = row_colors
+        self.start_row = start_row
+        self.total_size = max(total_size, 1)
+        self.on_progress = on_progress
+        self.expected_row = start_row
+        self.last_row = 0
+        self.stopped = False
+
+    def run(self, src, dst, max_col: int) -> None:
+        self.max_col = max_col
+        head = src.read(_CHUNK_SIZE)
+        prefix = re.search(rb"<(\w+:)?worksheet\b", head)
+        p = re.escape(prefix.group(1) or b"") if prefix else b""
+        self.prefix = (prefix.group(1) or b"") if prefix else b""
+        self._row = re.compile(rb"<" + p + rb"row\b([^>]*?)(/>|>(.*?)</" + p + rb"row>)", re.DOTALL)
+        self._cell = re.compile(rb"<" + p + rb"c\b([^>]*?)(/>|>(.*?)</" + p + rb"c>)", re.DOTALL)
+        row_end = b"</" + self.prefix + b"row>"
+
+        buffer, read = head, len(head)
+        while True:
+            cut = buffer.rfind(row_end)
+            if cut >= 0:
+                cut += len(row_end)
+                dst.write(self._patch(buffer[:cut]))
+                buffer = buffer[cut:]
+            chunk = src.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            read += len(chunk)
+            if self.on_progress:
+                self.on_progress(min(read / self.total_size, 1.0))
+        dst.write(self._patch(buffer))
+
+    def _patch(self, xml: bytes) -> bytes:
+        return self._row.sub(self._patch_row, xml)
+
+    def _patch_row(self, match: re.Match) -> bytes:
+        attrs = match.group(1)
+        ref = re.search(rb'\br="(\d+)"', attrs)
+        row = int(ref.group(1)) if ref else self.last_row + 1
+        self.last_row = row
+        if self.stopped or row < self.start_row:
+            return match.group(0)
+
+        content = match.group(3) or b""
+        # data rows end at the first row whose first cell is empty
+        first = self._cell.search(content)
+        if (
+            row != self.expected_row
+            or first is None
+            or not re.match(rb'(?:[^>]*?\sr="A\d+"|(?![^>]*?\sr=))', first.group(1))
+            or not re.search(rb"<(?:\w+:)?(?:v|is|f)\b", first.group(3) or b"")
+        ):
+            self.stopped = True
+            return match.group(0)
+        self.expected_row = row + 1
+
+        color = self.row_colors.get(row)
+        if color is None:
+            return match.group(0)
+
+        cells = self._parse_cells(content)
+        for col in range(1, self.max_col + 1):
+            cells.setdefault(col, b"<%sc r=\"%s%d\"/>" % (self.prefix, _column_letters(col), row))
+        patched = []
+        for col in sorted(cells):
+            cell = cells[col]
+            if col <= self.max_col:
+                style = re.search(rb'\ss="(\d+)"', cell[:cell.index(b">")])
+                xf = self.styles.with_fill(int(style.group(1)) if style else 0, color)
+                cell = _set_attr(cell, b"s", str(xf).encode())
+            patched.append(cell)
+        # keep non-cell children of the row (e.g. extLst) after the cells
+        patched.append(self._cell.sub(b"", content).strip())
+        tail = b"</" + self.prefix + b"row>"
+        return b"<" + self.prefix + b"row" + attrs + b">" + b"".join(patched) + tail
+
+    def _parse_cells(self, content: bytes) -> Dict[int, bytes]:
+        """Map column index → cell XML for the cells of a row."""
+        cells, col = {}, 0
+        for cell in self._cell.finditer(content):
+            ref = re.search(rb'\br="([A-Z]+)\d+"', cell.group(1))
+            col = _column_index(ref.group(1)) if ref else col + 1
+            cells[col] = cell.group(0)
+        return cells
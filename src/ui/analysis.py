@@ -1,9 +1,8 @@
 
 import streamlit as st
-import plotly.express as px
 import pandas as pd
 from utils.session_state import SessionStateManager
-from data_processing import generate_results_df
+from spring_change_detection.diff import generate_results_df, summarize_results
 
 def render_overview(result_df: pd.DataFrame) -> None:
     """
@@ -15,12 +14,13 @@ def render_overview(result_df: pd.DataFrame) -> None:
         st.info("No data available for analysis.")
         return
     
-    total_cars = len(result_df)
-    total_new = (result_df["Change Type"] == "New").sum()
-    total_spring = (result_df["Change Type"] == "Spring Changed").sum()
-    total_unchanged = (result_df["Change Type"] == "Unchanged").sum()
-    fleet_mass_change = result_df["Mass Difference"].sum()
-    fleet_mass_total = result_df["New Mass"].sum() + result_df["Old Mass"].sum()
+    summary = summarize_results(result_df)
+    total_cars = summary["total_cars"]
+    total_new = summary["new"]
+    total_spring = summary["spring_changed"]
+    total_unchanged = summary["unchanged"]
+    fleet_mass_change = summary["fleet_mass_change"]
+    fleet_mass_total = summary["fleet_mass_total"]
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -49,6 +49,9 @@ def render_mass_distribution(result_df: pd.DataFrame) -> None:
         st.info("No data available for mass analysis.")
         return
 
+    # plotly is only imported once a chart is drawn (faster app start-up)
+    import plotly.express as px
+
     counts = result_df["Mass Status"].value_counts()
     fig = px.pie(
         values=counts.values,
@@ -67,6 +70,8 @@ def render_change_type_distribution(result_df: pd.DataFrame) -> None:
         st.info("No data available for change type analysis.")
         return
 
+    import plotly.express as px
+
     counts = result_df["Change Type"].value_counts()
     fig = px.bar(
         x=counts.index,
@@ -86,6 +91,7 @@ def render_analysis():
     pta_type = st.session_state.get("pta_type")
     
     result_df = generate_results_df(old_df, new_df, pta_type)
+    st.session_state['results'] = result_df
 
     if result_df.empty:
         st.error("No data found. Please upload and process files first.")
@@ -0,0 +1,92 @@
+import streamlit as st
+import pandas as pd
+from spring_change_detection.batch import collect_pairs, max_workers, resolve_under, run_batch
+from spring_change_detection.config import BATCH_CONFIG
+from spring_change_detection.export import OUTPUT_FORMATS
+
+
+def render_batch_section() -> None:
+    """
+    Compare many old/new PTA pairs at once from a manifest or a folder on the server.
+
+    Every path is taken relative to BATCH_CONFIG["root"] and must stay inside it.
+    """
+    root = BATCH_CONFIG["root"]
+    if root is None:
+        st.info("ℹ️ Batch comparison is disabled: set the SPRING_BATCH_ROOT environment "
+                "variable to the server folder holding the PTA files and reports.")
+        return
+    st.markdown(
+        "Give a **manifest** (CSV/JSON with `name`, `old`, `new`, `type` columns) "
+        "or a **folder** with one sub-folder per program holding an `old*` and a `new*` Excel file, "
+        f"relative to the batch folder `{root}`."
+    )
+    source = st.text_input("📂 Manifest or folder path", key="batch_source")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        pta_type = st.radio("Default PTA type", ["VP", "VU"], horizontal=True, key="batch_type")
+    with col2:
+        workers = st.number_input(
+            "Worker processes", min_value=1, max_value=max_workers(), step=1,
+            value=min(BATCH_CONFIG["workers"] or 4, max_workers()), key="batch_workers"
+        )
+    with col3:
+        fmt = st.selectbox("Report format", OUTPUT_FORMATS, key="batch_format")
+    output_dir = st.text_input("📥 Report folder (optional)", key="batch_output_dir")
+
+    if st.button("🚀 Run Batch", type="primary", disabled=not source):
+        try:
+            pairs = collect_pairs(source, pta_type, root)
+            output_dir = resolve_under(root, output_dir) if output_dir else None
+        except (OSError, ValueError) as e:
+            st.error(f"❌ Error reading the pairs: {e}")
+            return
+        if not pairs:
+            st.warning("⚠️ No pair found.")
+            return
+
+        progress = st.progress(0.0, text=f"Comparing {len(pairs)} pairs...")
+        done = []
+
+        def on_result(row):
+            done.append(row)
+            progress.progress(len(done) / len(pairs), text=f"{row['name']}: {row['status']}")
+
+        st.session_state["batch_summary"] = run_batch(
+            pairs, int(workers), output_dir, fmt, on_result
+        )
+        progress.empty()
+
+    summary = st.session_state.get("batch_summary")
+    if summary is not None:
+        render_batch_summary(summary)
+
+
+def render_batch_summary(summary: pd.DataFrame) -> None:
+    """
+    Display the consolidated per-pair figures of a batch.
+    """
+    st.header("📊 Batch Overview")
+    ok = summary[summary["status"] == "ok"]
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("🗂️ Pairs", len(summary))
+    with col2:
+        st.metric("❌ Failed Pairs", len(summary) - len(ok))
+    with col3:
+        st.metric("🟥 New Cars", int(ok["new"].sum()))
+    with col4:
+        st.metric("🔁 Spring Changed Cars", int(ok["spring_changed"].sum()))
+
+    st.dataframe(
+        summary.drop(columns=["old_file", "new_file"]),
+        use_container_width=True, hide_index=True
+    )
+    st.download_button(
+        "📄 Download Summary (CSV)",
+        data=summary.to_csv(index=False).encode("utf-8"),
+        file_name="batch_summary.csv",
+        mime="text/csv",
+    )
@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-import io
-import base64
-from file_handler import FileHandler
-from openpyxl import load_workbook
-from config import UPLOAD_CONFIG
+import time
+import weakref
+from spring_change_detection.parsing import FileHandler
+from report_worker import submit_report
+from spring_change_detection.config import UPLOAD_CONFIG, VP_COLUMNS_KEY, VU_COLUMNS_KEY
+from utils.images import thumbnail
+from utils.session_state import compact_frame
 
 
 class Result:
@@ -14,9 +16,13 @@ class Result:
     """
     def __init__(self):
         """Initialize with session state data"""
-        self.new_df = st.session_state.get('input_excel_new', pd.DataFrame())
         self.res_df = st.session_state.get('results', pd.DataFrame())
         self.uploaded_file = st.session_state.get('new_file_object')
+        # the session only holds the compared columns; display needs the full sheet
+        if self.uploaded_file is not None:
+            self.new_df = FileHandler.read_display_sheet(self.uploaded_file)
+        else:
+            self.new_df = st.session_state.get('input_excel_new', pd.DataFrame())
         
         # Configure display settings
         self.image_max_width = 800  # Maximum width for displayed images in pixels
@@ -33,9 +39,17 @@ class Result:
         return [''] * len(row)
     
     def _prepare_display_data(self):
-        """Prepare the data for display by merging with results"""
-        # Merge new input with metadata and sort
-        display_df = self.new_df.copy()
+        """
+        Prepare the data for display by joining the new sheet with the results on Cell ID.
+        
+        The joined frame is kept in the session (compacted, see `compact_frame`)
+        and rebuilt only when the results or the new sheet change, so paging and
+        filtering reuse it. It refers to its inputs weakly so it never keeps
+        them alive once the shared caches drop them.
+        """
+        cached = st.session_state.get('results_view')
+        if cached is not None and cached[0]() is self.res_df and cached[1]() is self.new_df:
+            return cached[2]
         
         metadata_cols = [
             'Old Reference', 'New Reference',
@@ -43,137 +57,114 @@ class Result:
             'Cell ID New', 'Cell ID Old'
         ]
         
-        for col in metadata_cols:
-            display_df[col] = self.res_df[col]
-            
-        return display_df.sort_values('Cell ID New', ascending=True).reset_index(drop=True)
+        # Excel row number of every row of the new sheet (same ids as the comparison)
+        display_df = self.new_df.assign(**{'Cell ID New': self.new_df.index + 3})
+        display_df = display_df.merge(
+            self.res_df[metadata_cols], on='Cell ID New', how='left', sort=True
+        )
+        display_df = display_df[list(self.new_df.columns) + metadata_cols]
+        
+        display_df = compact_frame(display_df)
+        st.session_state['results_view'] = (
+            weakref.ref(self.res_df), weakref.ref(self.new_df), display_df
+        )
+        return display_df
+    
+    def _filter_display_data(self, display_df):
+        """Render the filter widgets and return the rows matching all of them"""
+        key_columns = VP_COLUMNS_KEY if st.session_state.get('pta_type', 'VP') == 'VP' else VU_COLUMNS_KEY
+        filter_columns = ['Change Type', 'Mass Status'] + [
+            col for col in key_columns if col in display_df.columns
+        ]
+        
+        mask = pd.Series(True, index=display_df.index)
+        with st.expander('🔎 Filters'):
+            cols = st.columns(3)
+            for i, col in enumerate(filter_columns):
+                options = sorted(display_df[col].dropna().unique().tolist(), key=str)
+                with cols[i % 3]:
+                    selected = st.multiselect(col, options, key=f'results_filter_{col}')
+                if selected:
+                    mask &= display_df[col].isin(selected)
+        return display_df[mask] if not mask.all() else display_df
     
     # ---- EXCEL DATA EXTRACTION METHODS ----
     
-    def _get_sheets_from_excel(self):
+    def _get_sheet_index(self):
         """
-        Extract all sheets and graphical elements from the uploaded Excel file
+        List the sheets of the uploaded Excel file without loading their content
         """
         if not self.uploaded_file:
-            return {}, {}
-        
-        # Load the workbook from the uploaded file
-        excel_data = io.BytesIO(self.uploaded_file.getvalue())
-        
-        # Get all sheet names using pandas (handles special characters better)
+            return {"sheet_names": [], "drawing_sheets": []}
         try:
-            excel_file = pd.ExcelFile(excel_data)
-            sheet_names = excel_file.sheet_names
+            return FileHandler.read_workbook(self.uploaded_file)
         except Exception as e:
             st.error(f"Error reading sheet names: {str(e)}")
-            return {}, {}
-        
-        # Extract data and graphs
-        sheets_data = {}
-        graphs_data = {}
-        
-        # Reset file pointer and load workbook for image/chart extraction
-        excel_data.seek(0)
-        try:
-            # Use data_only=True to get calculated values in cells
-            wb = load_workbook(excel_data, data_only=True)
-            
-            # First process PTA sheet separately
-            if UPLOAD_CONFIG["sheet_name"] in wb.sheetnames:
-                pta_ws = wb[UPLOAD_CONFIG["sheet_name"]]
-                pta_graphs = self._extract_charts_from_sheet(pta_ws)
-                if pta_graphs:
-                    graphs_data["PTA Graphs"] = pta_graphs
-        except Exception as e:
-            st.warning(f"Could not extract graphs from PTA sheet: {str(e)}")
-        
-        # Process all other sheets
-        for sheet_name in sheet_names:
-            try:
-                # Skip PTA sheet - we process it separately
-                if sheet_name == UPLOAD_CONFIG["sheet_name"]:
-                    continue
-                
-                # Reset file pointer before reading each sheet
-                excel_data.seek(0)
-                
-                # Load sheet data
-                df = pd.read_excel(excel_data, sheet_name=sheet_name)
-                sheets_data[sheet_name] = df
-                
-                # Try to extract graphs from this sheet
-                if sheet_name in wb.sheetnames:
-                    sheet_graphs = self._extract_charts_from_sheet(wb[sheet_name])
-                    if sheet_graphs:
-                        # Store graphs with descriptive name
-                        graph_key = f"{sheet_name} Graphs"
-                        graphs_data[graph_key] = sheet_graphs
-                
-            except Exception as e:
-                sheets_data[sheet_name] = f"Error loading sheet: {str(e)}"
-        
-        return sheets_data, graphs_data
+            return {"sheet_names": [], "drawing_sheets": []}
     
-    def _extract_charts_from_sheet(self, worksheet):
-        """Extract and process images/charts from worksheet"""
-        charts = []
-        
-        # Process all embedded images
+    def _get_sheet_graphs(self, sheet_name):
+        """Extract the graphs of one sheet (loaded on demand, cached by file content)"""
         try:
-            for image in worksheet._images:
-                try:
-                    # Get image data
-                    img_data = image._data()
-                    if img_data:
-                        # Convert to base64 for displaying in HTML
-                        img_b64 = base64.b64encode(img_data).decode()
-                        # Store image data with metadata for sizing
-                        charts.append({
-                            'data': img_b64,
-                            'width': image.width,
-                            'height': image.height
-                        })
-                except Exception as e:
-                    st.warning(f"Could not extract image: {str(e)}")
+            return self._extract_charts_from_sheet(
+                FileHandler.read_sheet_images(self.uploaded_file, sheet_name)
+            )
         except Exception as e:
             st.warning(f"Error accessing images in worksheet: {str(e)}")
-                
+            return []
+    
+    def _extract_charts_from_sheet(self, images):
+        """Downscale the images extracted from a worksheet for display (cached by image content)"""
+        charts = []
+        for image in images:
+            data, width, height = thumbnail(image['data'], self.image_max_width)
+            # Keep the size the image is anchored with in the workbook
+            charts.append({
+                'data': data,
+                'width': image['width'] or width,
+                'height': image['height'] or height
+            })
         return charts
     
     # ---- DISPLAY METHODS ----
     
     def display_results(self):
-        """Main method to display analysis results in a tabbed interface"""
+        """Main method to display analysis results with one sheet shown at a time"""
         if self.new_df.empty or self.res_df.empty:
             st.warning('No data to display.')
             return
         
-        # STEP 1: Extract data and graphs from Excel file
-        sheets_data, graphs_data = self._get_sheets_from_excel()
+        # STEP 1: List the sheets (their content is loaded only when selected)
+        sheet_index = self._get_sheet_index()
         
         # STEP 2: Create tab names in appropriate order
-        tab_names = self._create_tab_names(sheets_data, graphs_data)
+        tab_names = self._create_tab_names(sheet_index)
         
-        # STEP 3: Create tabbed interface
-        tabs = st.tabs(tab_names)
+        # STEP 3: Tab selector; only the selected tab is loaded and rendered
+        selected = st.radio(
+            'Sheet', tab_names, horizontal=True,
+            key='results_tab', label_visibility='collapsed'
+        )
         
-        # STEP 4: Render content in each tab
-        self._render_tabs_content(tabs, tab_names, sheets_data, graphs_data)
+        # STEP 4: Render content of the selected tab
+        self._render_tab_content(selected, tab_names)
         
         # STEP 5: Add download section below tabs
         self._add_download_section()
     
-    def _create_tab_names(self, sheets_data, graphs_data):
+    def _create_tab_names(self, sheet_index):
         """Create ordered list of tab names"""
         # Always start with Analysis Results
         tab_names = ["Analysis Results"]
         
         # Add PTA Graphs next if available
-        if "PTA Graphs" in graphs_data:
+        if (UPLOAD_CONFIG["sheet_name"] in sheet_index["drawing_sheets"]
+                and self._get_sheet_graphs(UPLOAD_CONFIG["sheet_name"])):
             tab_names.append("PTA Graphs")
             
         # Add all other sheets
-        sheet_names = list(sheets_data.keys())
+        sheet_names = [
+            name for name in sheet_index["sheet_names"] if name != UPLOAD_CONFIG["sheet_name"]
+        ]
         
         # Try to find "Assiette théorique" or similar and place it last
         for special_name in ["Assiette théorique", "Assiette theorique", "Assiette"]:
@@ -189,55 +180,65 @@ class Result:
         
         return tab_names
     
-    def _render_tabs_content(self, tabs, tab_names, sheets_data, graphs_data):
-        """Render content in each tab"""
-        # STEP 1: First tab - Analysis Results with highlighting
-        with tabs[0]:
+    def _render_tab_content(self, tab_name, tab_names):
+        """Load and render the content of the selected tab"""
+        # Analysis Results with highlighting
+        if tab_name == "Analysis Results":
             self._render_analysis_results()
+            return
             
-        # STEP 2: PTA Graphs tab if it exists
-        tab_index = 1
-        if "PTA Graphs" in graphs_data and len(tab_names) > 1:
-            with tabs[tab_index]:
-                self._display_graphs(graphs_data["PTA Graphs"], "PTA Sheet Graphs")
-            tab_index += 1
+        # PTA Graphs tab
+        if tab_name == "PTA Graphs":
+            self._display_graphs(self._get_sheet_graphs(UPLOAD_CONFIG["sheet_name"]), "PTA Sheet Graphs")
+            return
         
-        # STEP 3: Render all other sheets
-        for i, sheet_name in enumerate(tab_names[tab_index:]):
-            with tabs[tab_index + i]:
-                # Display sheet data if available
-                if sheet_name in sheets_data:
-                    sheet_content = sheets_data[sheet_name]
-                    if isinstance(sheet_content, pd.DataFrame):
-                        st.dataframe(sheet_content)
-                    else:
-                        st.error(sheet_content)  # Display error message
-                    
-                    # Special handling for last sheet which might be Assiette théorique
-                    is_last_sheet = (tab_index + i == len(tab_names) - 1)
-                    special_sheet = any(s in sheet_name.lower() for s in ["assiette", "théorique", "theorique"])
-                    
-                    # Add graphs from this sheet if available
-                    graph_key = f"{sheet_name} Graphs"
-                    if graph_key in graphs_data:
-                        title = "Sheet Graphs"
-                        if is_last_sheet and special_sheet:
-                            title = "Assiette Théorique"
-                            # Special display for this important graph
-                            self._display_graphs(graphs_data[graph_key], title, is_special=True)
-                        else:
-                            self._display_graphs(graphs_data[graph_key], title)
-                
-                # Add sheet name caption
-                st.caption(f"Sheet: {sheet_name}")
+        # Any other sheet: display sheet data
+        try:
+            st.dataframe(FileHandler.read_sheet(self.uploaded_file, tab_name))
+        except Exception as e:
+            st.error(f"Error loading sheet: {str(e)}")  # Display error message
+        
+        # Special handling for last sheet which might be Assiette théorique
+        is_last_sheet = tab_name == tab_names[-1]
+        special_sheet = any(s in tab_name.lower() for s in ["assiette", "théorique", "theorique"])
+        
+        # Add graphs from this sheet if available
+        graphs = self._get_sheet_graphs(tab_name)
+        if graphs:
+            if is_last_sheet and special_sheet:
+                # Special display for this important graph
+                self._display_graphs(graphs, "Assiette Théorique", is_special=True)
+            else:
+                self._display_graphs(graphs, "Sheet Graphs")
+        
+        # Add sheet name caption
+        st.caption(f"Sheet: {tab_name}")
     
     def _render_analysis_results(self):
-        """Render the analysis results with styling in the first tab"""
+        """Render the analysis results with filters, paging and styling in the first tab"""
         # Prepare data
         display_df = self._prepare_display_data()
+        filtered = self._filter_display_data(display_df)
+        
+        # Paging: only the visible page is styled and sent to the browser
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            page_size = st.selectbox('Rows per page', [50, 100, 500, 1000], key='results_page_size')
+        n_pages = max((len(filtered) - 1) // page_size + 1, 1)
+        # Narrower filters can leave the current page past the end
+        if st.session_state.get('results_page', 1) > n_pages:
+            st.session_state['results_page'] = n_pages
+        with col2:
+            page = st.number_input(
+                'Page', min_value=1, max_value=n_pages, step=1, key='results_page'
+            )
+        page = int(page)
+        with col3:
+            st.caption(f'{len(filtered)} of {len(display_df)} rows · page {page} of {n_pages}')
+        page_df = filtered.iloc[(page - 1) * page_size:page * page_size]
         
         # Apply styling
-        styled = display_df.style.apply(self._highlight_row, axis=1)
+        styled = page_df.style.apply(self._highlight_row, axis=1)
         
         # Display styled dataframe
         st.dataframe(styled, use_container_width=True)
@@ -259,51 +260,16 @@ class Result:
             
         for i, img_info in enumerate(graphs):
             try:
-                img_b64 = img_info['data'] if isinstance(img_info, dict) else img_info
+                # Calculate display width
+                display_width = min(self.image_max_width, img_info['width'])
                 
-                # Calculate display size
-                if isinstance(img_info, dict) and 'width' in img_info and 'height' in img_info:
-                    # Get original dimensions
-                    orig_width = img_info['width']
-                    orig_height = img_info['height']
-                    
-                    # Calculate appropriate display width
-                    display_width = min(self.image_max_width, orig_width)
-                    
-                    # Scale height proportionally
-                    if orig_width > 0:  # Avoid division by zero
-                        scale_factor = display_width / orig_width
-                        display_height = int(orig_height * scale_factor)
-                    else:
-                        display_height = orig_height
-                    
-                    # Special handling for important graphs
-                    if is_special:
-                        # Make important graphs more prominent
-                        display_width = min(self.image_max_width, int(orig_width * 1.2))
-                        if orig_width > 0:
-                            scale_factor = display_width / orig_width
-                            display_height = int(orig_height * scale_factor)
-                else:
-                    # Default size if dimensions not available
-                    display_width = "100%"
-                    display_height = None
+                # Special handling for important graphs
+                if is_special:
+                    # Make important graphs more prominent
+                    display_width = min(self.image_max_width, int(img_info['width'] * 1.2))
                 
-                # Display image with appropriate size
-                if display_height:
-                    st.markdown(f"""
-                    <div style="text-align: center; margin: 20px auto;">
-                        <img src="data:image/png;base64,{img_b64}" 
-                             style="width: {display_width}px; height: {display_height}px; max-width: 100%;">
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div style="text-align: center; margin: 20px auto;">
-                        <img src="data:image/png;base64,{img_b64}" 
-                             style="width: {display_width}; max-width: 100%;">
-                    </div>
-                    """, unsafe_allow_html=True)
+                # Served as a media file instead of an inline data URI
+                st.image(img_info['data'], width=max(display_width, 1))
             except Exception as e:
                 st.warning(f"Could not display image {i+1}: {str(e)}")
     
@@ -311,11 +277,19 @@ class Result:
         """Add download section for Excel report"""
         st.subheader('📥 Download Results')
         try:
-            # Prepare data for export
-            display_df = self._prepare_display_data()
+            if self.uploaded_file is None or self.res_df.empty:
+                raise ValueError("Both 'results' and 'original file' are required.")
             
-            # Generate Excel bytes
-            data = FileHandler.create_excel_bytes(display_df)
+            # The report is built once in the background and cached;
+            # later reruns get the finished bytes immediately
+            job = submit_report(self.uploaded_file.getvalue(), self.res_df)
+            if not job.done():
+                progress = st.progress(0.0, text='Building Excel report...')
+                while not job.done():
+                    progress.progress(job.progress, text='Building Excel report...')
+                    time.sleep(0.2)
+                progress.empty()
+            data = job.result()
             
             # Add download button
             st.download_button(
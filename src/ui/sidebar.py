@@ -1,5 +1,12 @@
+import tracemalloc
+
+import pandas as pd
 import streamlit as st
-import streamlit.components.v1 as com
+
+from spring_change_detection.instrumentation import set_memory_tracing, summarize_stages
+from config import SESSION_MEMORY_CONFIG
+
+DIAGNOSTICS_COLUMNS = ["stage", "file", "sheet", "source", "seconds", "rows", "columns", "peak_mb", "error"]
 
 def render_sidebare():
     with st.sidebar:
@@ -59,6 +66,16 @@ def render_sidebare():
                 ):
                     st.session_state.current_step = step['key']
                     st.rerun()
+        
+        #TODO: Batch mode (many file pairs at once)
+        if st.button(
+            "🗂️ Batch Comparison",
+            key="step_batch",
+            type="primary" if current_step == 'batch' else "secondary",
+            use_container_width=True,
+        ):
+            st.session_state.current_step = 'batch'
+            st.rerun()
         st.divider()
 
         #TODO: About Project
@@ -89,3 +106,69 @@ def is_step_completed(step_key):
     elif step_key == 'results':
         return st.session_state.get('analysis_completed', False)
     return False
+
+
+def render_diagnostics():
+    """Collapsible panel with the stage timings recorded in this session."""
+    records = list(st.session_state.get("diagnostics") or [])
+    with st.sidebar:
+        with st.expander("🩺 Diagnostics", expanded=False):
+            tracing = st.toggle(
+                "Measure peak memory",
+                value=tracemalloc.is_tracing(),
+                help="Traces allocations of the whole server: slower, turn off when done.",
+            )
+            if tracing != tracemalloc.is_tracing():
+                set_memory_tracing(tracing)
+
+            if not records:
+                st.caption("No stage recorded yet in this session.")
+                return
+
+            summary = pd.DataFrame.from_dict(summarize_stages(records), orient="index")
+            summary.index.name = "stage"
+            st.markdown("**Per stage**")
+            st.dataframe(summary.round(3), use_container_width=True)
+
+            recent = pd.DataFrame(records[::-1])
+            st.markdown(f"**Last {len(records)} stages**")
+            st.dataframe(
+                recent[[c for c in DIAGNOSTICS_COLUMNS if c in recent.columns]],
+                use_container_width=True,
+                hide_index=True,
+            )
+            if st.button("Clear diagnostics", key="clear_diagnostics"):
+                st.session_state["diagnostics"].clear()
+                st.rerun()
+
+
+def render_memory_report():
+    """Collapsible panel with the memory held by this session (see SessionStateManager.memory_report)"""
+    account = st.session_state.get("memory_account")
+    report = account.report if account is not None else None
+    if report is None:
+        return
+    mb = 1024 * 1024
+    with st.sidebar:
+        with st.expander("🧠 Session memory", expanded=False):
+            st.progress(
+                min(report["session_bytes"] / SESSION_MEMORY_CONFIG["session_max_bytes"], 1.0),
+                text=f"This session: {report['session_bytes'] / mb:.1f} of "
+                     f"{SESSION_MEMORY_CONFIG['session_max_bytes'] / mb:.0f} MB",
+            )
+            st.progress(
+                min(report["process_bytes"] / SESSION_MEMORY_CONFIG["process_max_bytes"], 1.0),
+                text=f"All sessions: {report['process_bytes'] / mb:.1f} of "
+                     f"{SESSION_MEMORY_CONFIG['process_max_bytes'] / mb:.0f} MB",
+            )
+            st.caption(
+                f"Shared caches: {report['cache_bytes'] / mb:.1f} MB · "
+                f"spilled to disk: {report['spilled_bytes'] / mb:.1f} MB"
+            )
+            # widget values and flags are a few bytes each
+            items = pd.DataFrame(
+                [item for item in report["items"] if item["bytes"] >= 1024],
+                columns=["key", "bytes", "status"],
+            )
+            items["MB"] = (items.pop("bytes").astype(float) / mb).round(2)
+            st.dataframe(items, use_container_width=True, hide_index=True)
@@ -1,7 +1,9 @@
 import streamlit as st
-from file_handler import FileHandler
+from spring_change_detection.parsing import FileHandler
+from spring_change_detection.diff import invalidate_results
+from utils.session_state import SessionStateManager
 import pandas as pd
-from config import UPLOAD_CONFIG
+from spring_change_detection.config import UPLOAD_CONFIG
 
 def render_upload_section():  
     # Prompt user to select PTA type (VP or VU) before file upload
@@ -48,21 +50,35 @@ def _process_upload_file(file, type_file, session_key):
     - else display a commnet error returned from validate_excel_file
     """
     try:
-        is_valid, comment, df = FileHandler.validate_excel_file(file, type_file)
+        is_valid, comment, df = FileHandler.validate_excel_file(
+            file, type_file, st.session_state.get('pta_type', 'VP')
+        )
         
         if is_valid: 
             st.success(f"✅ {type_file.title()} file uploaded seccussfully")
             
+            # a different file replaces the previous one: drop stale results
+            file_hash = FileHandler.file_hash(file)
+            if st.session_state.get(type_file + '_file_hash') != file_hash:
+                previous_df = st.session_state.get(session_key)
+                if previous_df is not None:
+                    invalidate_results(previous_df)
+                SessionStateManager.remove_results()
+                st.session_state['analysis_completed'] = False
+                st.session_state[type_file + '_file_hash'] = file_hash
+            
             #add the df to the session state
             st.session_state[session_key] = df
             
-            # Store the original file object too for later use
+            # Store the original file object too for later use (only the new
+            # file is read again, for the display sheet, images and report)
             # Use a different name than the widget key to avoid conflicts
-            st.session_state[type_file + '_file_object'] = file
+            if type_file == "new":
+                st.session_state[type_file + '_file_object'] = file
                 
-            #displaying the df
+            #displaying the full sheet (the session df only holds the compared columns)
             with st.expander(f"Preview {type_file.title()} File data"):
-                st.dataframe(df)
+                st.dataframe(FileHandler.read_display_sheet(file))
         else:
             st.error(f"❌{comment}")
             st.session_state[session_key] = None
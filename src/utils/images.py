@@ -0,0 +1,45 @@
+import io
+from typing import Tuple
+
+from spring_change_detection.config import CACHE_CONFIG
+from spring_change_detection.cache import LRUCache, content_hash
+
+# downscaled images shared by every session of the server process
+_THUMBNAIL_CACHE = LRUCache(CACHE_CONFIG["image_cache_max_bytes"])
+
+
+def thumbnail(data: bytes, max_width: int) -> Tuple[bytes, int, int]:
+    """
+    Downscale an image to at most `max_width` pixels wide, cached by content.
+
+    Images already narrow enough are returned unchanged; wider ones are
+    resized with their aspect ratio kept and re-encoded in their own format
+    (PNG when it cannot be written back).
+
+    Args:
+        data: Raw bytes of the image.
+        max_width: Maximum width in pixels.
+
+    Returns:
+        Tuple containing the image bytes, width and height.
+    """
+    key = (content_hash(data), max_width)
+    cached = _THUMBNAIL_CACHE.get(key)
+    if cached is None:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if width <= max_width:
+                cached = (data, width, height)
+            else:
+                height = max(round(height * max_width / width), 1)
+                resized = image.resize((max_width, height), Image.LANCZOS)
+                fmt = image.format if image.format in ("PNG", "JPEG", "GIF", "WEBP") else "PNG"
+                if fmt == "JPEG" and resized.mode not in ("RGB", "L"):
+                    resized = resized.convert("RGB")
+                output = io.BytesIO()
+                resized.save(output, format=fmt)
+                cached = (output.getvalue(), max_width, height)
+        _THUMBNAIL_CACHE.put(key, cached)
+    return cached
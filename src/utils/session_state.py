@@ -1,4 +1,94 @@
+import weakref
+from collections import deque
+
+import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import SESSION_MEMORY_CONFIG
+from spring_change_detection import store
+from spring_change_detection.config import INSTRUMENTATION_CONFIG
+from spring_change_detection.cache import cached_bytes, estimate_size, frame_fingerprint, is_cached
+
+# memory accounts of the live sessions of the server process
+_ACCOUNTS = weakref.WeakSet()
+# measured size of the frames held by sessions: id -> (weak reference, bytes)
+_FRAME_SIZES = {}
+
+
+class MemoryAccount:
+    """Memory held by one session, as measured at the end of its last run."""
+
+    def __init__(self):
+        self.session_bytes = 0
+        self.report = None
+        _ACCOUNTS.add(self)
+
+
+class SpilledFrame:
+    """Placeholder of a session frame written to the store, restored on the next run."""
+
+    def __init__(self, key, nbytes, shape):
+        self.key = key
+        self.nbytes = nbytes
+        self.shape = shape
+
+    def __repr__(self):
+        return f"SpilledFrame(shape={self.shape}, nbytes={self.nbytes})"
+
+
+def compact_frame(df):
+    """
+    Copy of a frame using less memory, with the same values.
+
+    Text columns where values repeat become categoricals and integer
+    columns take the smallest integer type holding their values.
+
+    Args:
+        df: DataFrame owned by the session (e.g. a display view).
+
+    Returns:
+        The compacted DataFrame.
+    """
+    columns = {}
+    for i, col in enumerate(df.columns):
+        s = df.iloc[:, i]
+        if s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) == "string":
+            if s.nunique() <= len(s) // 2:
+                s = s.astype("category")
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            s = pd.to_numeric(s, downcast="integer")
+        columns[i] = s
+    compacted = pd.concat(columns, axis=1) if columns else df.copy()
+    compacted.columns = df.columns
+    return compacted
+
+
+def _frame_size(df):
+    """Deep size of a frame, measured once per object (frames are never modified in place)."""
+    entry = _FRAME_SIZES.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    size = estimate_size(df)
+    # forget the frames that were freed before storing a new one
+    for key in [k for k, (ref, _) in list(_FRAME_SIZES.items()) if ref() is None]:
+        _FRAME_SIZES.pop(key, None)
+    _FRAME_SIZES[id(df)] = (weakref.ref(df), size)
+    return size
+
+
+def _measure(value):
+    """Estimated size of a session value; weak references are not counted."""
+    if isinstance(value, pd.DataFrame):
+        return _frame_size(value)
+    if isinstance(value, SpilledFrame):
+        return value.nbytes
+    if isinstance(value, weakref.ref):
+        return 0
+    if isinstance(value, (tuple, list)):
+        return sum(_measure(v) for v in value)
+    return estimate_size(value)
+
 
 class SessionStateManager:
     """
@@ -15,12 +105,29 @@ class SessionStateManager:
         "current_step": "upload",
     }
 
+    # recomputed on the next run when dropped (results by app.main, the
+    # display view by Result._prepare_display_data)
+    EVICTABLE = ("results_view", "results")
+    # frames written to the store when dropped, and restored on the next run
+    SPILLABLE = ("input_excel_old", "input_excel_new")
+
     @staticmethod
     def initialize():
         """Initialize session state keys with default values."""
         for key, default in SessionStateManager.DEFAULTS.items():
             if key not in st.session_state:
                 st.session_state[key] = default
+        # stage records of this session, kept across workflow resets
+        if "diagnostics" not in st.session_state:
+            st.session_state["diagnostics"] = deque(maxlen=INSTRUMENTATION_CONFIG["session_records"])
+        if "memory_account" not in st.session_state:
+            st.session_state["memory_account"] = MemoryAccount()
+
+    @staticmethod
+    def session_id():
+        """Id of the current browser session (None outside a Streamlit run)."""
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
 
     @staticmethod
     def clear_all():
@@ -49,3 +156,121 @@ class SessionStateManager:
                 st.session_state[key] = False
             else:
                 st.session_state[key] = None
+
+    #__TODO: Memory accounting_______________________________________________
+    @staticmethod
+    def memory_report():
+        """
+        Measure the objects held by the session.
+
+        An object also held by a process-wide cache (parsed sheets, results,
+        reports) or already counted under another key (e.g. a file uploader
+        and its file object) is "shared": dropping it from the session frees
+        nothing.
+
+        Returns:
+            Dict with:
+              - "items": one {"key", "bytes", "status"} per value of the
+                session, largest first; status is "session", "shared" or "spilled"
+              - "session_bytes": bytes held by this session only
+              - "spilled_bytes": bytes of the frames spilled to the store
+              - "process_bytes": bytes held by every live session of the process
+              - "cache_bytes": bytes of the process-wide caches
+        """
+        items, seen = [], set()
+        for key, value in st.session_state.to_dict().items():
+            if key == "memory_account" or value is None:
+                continue
+            if isinstance(value, SpilledFrame):
+                status = "spilled"
+            elif id(value) in seen or is_cached(value):
+                status = "shared"
+            else:
+                status = "session"
+            if not isinstance(value, (str, int, float)):  # small values are interned
+                seen.add(id(value))
+            items.append({"key": key, "bytes": _measure(value), "status": status})
+        items.sort(key=lambda item: item["bytes"], reverse=True)
+
+        account = st.session_state.get("memory_account")
+        session_bytes = sum(item["bytes"] for item in items if item["status"] == "session")
+        if account is not None:
+            account.session_bytes = session_bytes
+        return {
+            "items": items,
+            "session_bytes": session_bytes,
+            "spilled_bytes": sum(item["bytes"] for item in items if item["status"] == "spilled"),
+            "process_bytes": sum(a.session_bytes for a in list(_ACCOUNTS)),
+            "cache_bytes": cached_bytes(),
+        }
+
+    @staticmethod
+    def enforce_memory_budget():
+        """
+        Keep the session within SESSION_MEMORY_CONFIG, at the end of a run.
+
+        While the session holds more than its budget, or all sessions more
+        than the process budget, the session's own objects are dropped,
+        largest first: recomputable values (EVICTABLE) then the input frames
+        (SPILLABLE), which are written to the persistent store and restored
+        by `restore_spilled` on the next run.
+
+        Returns:
+            The memory report after enforcement (see `memory_report`).
+        """
+        report = SessionStateManager.memory_report()
+        over = report["session_bytes"] - SESSION_MEMORY_CONFIG["session_max_bytes"]
+        over_process = report["process_bytes"] - SESSION_MEMORY_CONFIG["process_max_bytes"]
+        if over <= 0 and over_process <= 0:
+            return SessionStateManager._record(report)
+
+        owned = {item["key"]: item["bytes"] for item in report["items"] if item["status"] == "session"}
+        candidates = (
+            sorted((k for k in SessionStateManager.EVICTABLE if k in owned), key=owned.get, reverse=True)
+            + sorted((k for k in SessionStateManager.SPILLABLE if k in owned), key=owned.get, reverse=True)
+        )
+        for key in candidates:
+            if over <= 0 and over_process <= 0:
+                break
+            if key in SessionStateManager.EVICTABLE:
+                st.session_state[key] = None
+            elif owned[key] < SESSION_MEMORY_CONFIG["spill_min_bytes"] or not SessionStateManager._spill(key):
+                continue
+            over -= owned[key]
+            over_process -= owned[key]
+        return SessionStateManager._record(SessionStateManager.memory_report())
+
+    @staticmethod
+    def restore_spilled():
+        """
+        Load the frames spilled by `enforce_memory_budget` back into the session.
+
+        A frame the store no longer has (deleted over its disk budget) is
+        dropped and the analysis has to be run again on new uploads.
+        """
+        for key in SessionStateManager.SPILLABLE:
+            spilled = st.session_state.get(key)
+            if not isinstance(spilled, SpilledFrame):
+                continue
+            df = store.load(spilled.key)
+            st.session_state[key] = df
+            if df is None:
+                st.session_state["analysis_completed"] = False
+
+    @staticmethod
+    def _spill(key):
+        """Write the frame of `key` to the store and keep a placeholder; False when it cannot be stored."""
+        df = st.session_state[key]
+        spill_key = ("session", frame_fingerprint(df))
+        if not (store.contains(spill_key) or store.save(spill_key, df)):
+            return False
+        st.session_state[key] = SpilledFrame(spill_key, _frame_size(df), df.shape)
+        return True
+
+    @staticmethod
+    def _record(report):
+        """Keep `report` as the last report of the session."""
+        account = st.session_state.get("memory_account")
+        if account is not None:
+            account.report = report
+        return report